@@ -0,0 +1,121 @@
+"""
+Sorties découpées par ville avec un index de chargement à la demande
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque produit peut être écrit en un fichier par ville :
+
+    <racine>/<produit>/<ville>.json
+    <racine>/index.json
+
+index.json liste les villes, les produits, la période couverte et la taille
+de chaque fichier. Un client qui choisit un lieu ne télécharge que l'index
+et les fichiers de cette ville : la charge au démarrage ne grossit plus avec
+le nombre de villes.
+
+Usage:
+    from city_shards import write_city_shards
+
+    write_city_shards(SHARDS_DIR, "ndvi", {
+        "Cotonou": (location_entry, ["2025-01-01", "2025-01-17"]),
+    }, meta={"source": "NASA MODIS NDVI"})
+"""
+
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+from json_stream import write_json_stream
+
+INDEX_FILE = "index.json"
+
+
+def shard_slug(city):
+    """Nom de fichier ASCII pour une ville ("Sèmè-Podji" → "Seme-Podji")"""
+    ascii_name = unicodedata.normalize('NFKD', city).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', ascii_name).strip('_') or "city"
+
+
+def load_shard_index(root):
+    """Index existant (vide s'il n'existe pas encore)"""
+    index_path = Path(root) / INDEX_FILE
+    if not index_path.exists():
+        return {"products": {}, "cities": []}
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def shard_paths(root, entries):
+    """Fichiers écrits pour un produit (entrées de write_city_shards) et l'index"""
+    root = Path(root)
+    return [root / entry["file"] for entry in entries.values()] + [root / INDEX_FILE]
+
+
+def write_city_shards(root, product, shards, meta=None, pretty=False):
+    """Écrire un fichier par ville pour un produit et mettre à jour l'index
+
+    shards : {ville: (contenu, dates)} ; contenu est l'objet JSON de la ville
+    (les listes peuvent être des itérables paresseux), dates les dates de sa
+    série, utilisées pour la période indiquée dans l'index.
+    """
+    root = Path(root)
+    product_dir = root / product
+    product_dir.mkdir(parents=True, exist_ok=True)
+
+    index = load_shard_index(root)
+    previous = index["products"].get(product, {}).get("cities", {})
+    last_update = datetime.now().strftime("%Y-%m-%d")
+
+    entries = {}
+    for city, (payload, dates) in shards.items():
+        relative_path = f"{product}/{shard_slug(city)}.json"
+        shard_path = root / relative_path
+
+        with open(shard_path, 'w', encoding='utf-8') as f:
+            write_json_stream(f, {
+                "city": city,
+                "product": product,
+                "lastUpdate": last_update,
+                **(meta or {}),
+                "data": payload
+            }, pretty=pretty, float_digits=4)
+
+        dates = sorted(dates)
+        entries[city] = {
+            "file": relative_path,
+            "bytes": shard_path.stat().st_size,
+            "start": dates[0] if dates else None,
+            "end": dates[-1] if dates else None,
+            "entries": len(dates)
+        }
+
+    # Supprimer les fichiers des villes disparues de ce produit
+    for city, entry in previous.items():
+        if city not in entries:
+            stale_path = root / entry["file"]
+            if stale_path.exists():
+                stale_path.unlink()
+
+    index["products"][product] = {
+        **(meta or {}),
+        "lastUpdate": last_update,
+        "cities": entries
+    }
+    index["cities"] = sorted({
+        city for product_entry in index["products"].values()
+        for city in product_entry["cities"]
+    })
+    index["lastUpdate"] = last_update
+
+    tmp_path = root / (INDEX_FILE + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2 if pretty else None, ensure_ascii=False)
+    os.replace(tmp_path, root / INDEX_FILE)
+
+    total_bytes = sum(entry["bytes"] for entry in entries.values())
+    print(f"🗂️  {len(entries)} fichiers par ville pour {product} ({total_bytes / 1024:.1f} KB) → {product_dir}")
+
+    return entries
@@ -0,0 +1,88 @@
+"""
+Export colonnaire Parquet partitionné par produit et par année
+IleRise - NASA Space Apps Challenge 2025
+
+Les CSV répètent ville, coordonnées et statistiques sur chaque ligne. Ce
+module écrit les séries en Parquet typé et compressé (zstd), partitionné
+façon Hive :
+
+    <racine>/product=smap-sm_rootzone/year=2025/part-0.parquet
+
+Les colonnes texte répétitives (ville, statut, couche...) sont encodées
+en dictionnaire. Les analystes peuvent filtrer sur product/year sans lire
+les autres partitions (predicate pushdown).
+
+Usage:
+    from columnar_export import write_partitioned_dataset
+
+    write_partitioned_dataset(PARQUET_DIR, "precipitation", {
+        "city": [...], "date": [...], "precipitation_mm": [...]
+    }, float_columns=["precipitation_mm"], dictionary_columns=["city"])
+
+Requis (optionnel) :
+    pip install pyarrow
+"""
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def parquet_available():
+    """pyarrow est-il installé ?"""
+    return pa is not None
+
+
+def write_partitioned_dataset(root, product, columns, date_column="date",
+                              float_columns=(), dictionary_columns=()):
+    """Écrire un jeu de colonnes en Parquet partitionné product/year
+
+    columns : {nom: liste de valeurs}, toutes de même longueur.
+    date_column : dates ISO "AAAA-MM-JJ" (stockées en date32).
+    float_columns : stockées en float32.
+    dictionary_columns : chaînes encodées en dictionnaire.
+
+    Les partitions existantes du produit pour les mêmes années sont
+    remplacées. Retourne le nombre de lignes écrites, ou None si pyarrow
+    n'est pas installé.
+    """
+    if pa is None:
+        print("⚠️  pyarrow non installé : export Parquet ignoré (pip install pyarrow)")
+        return None
+
+    dates = np.asarray(columns[date_column], dtype='datetime64[D]')
+    num_rows = len(dates)
+    if num_rows == 0:
+        return 0
+
+    arrays = {}
+    for name, values in columns.items():
+        if name == date_column:
+            arrays[name] = pa.array(dates, type=pa.date32())
+        elif name in float_columns:
+            arrays[name] = pa.array(np.asarray(values, dtype=np.float32))
+        elif name in dictionary_columns:
+            arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            arrays[name] = pa.array(values)
+
+    arrays["product"] = pa.array([product] * num_rows).dictionary_encode()
+    arrays["year"] = pa.array(dates.astype('datetime64[Y]').astype(int) + 1970, type=pa.int16())
+
+    table = pa.table(arrays)
+
+    pq.write_to_dataset(
+        table,
+        root_path=str(root),
+        partition_cols=["product", "year"],
+        compression="zstd",
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet"
+    )
+
+    return num_rows
@@ -10,13 +10,24 @@ Requis:
 """
 
 import pandas as pd
+import numpy as np
 import json
+from collections import deque
 from pathlib import Path
 from datetime import datetime
+from precompress import precompress_outputs
+from product_registry import get_codec
+from spatial_index import LocationIndex
 
 # Configuration
 RAW_DATA_DIR = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data")
 OUTPUT_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
+PRECOMPRESS_MANIFEST = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json")
+CHUNK_ROWS = 200_000  # Lignes lues par bloc (mémoire bornée)
+MAX_CITY_DISTANCE_KM = 111.2  # Au-delà, le point n'est rattaché à aucune ville (~1 degré)
+
+# Décodage LST (K × 50 → °C) : registre des produits
+LST_CODEC = get_codec("MOD11A2", "LST_Day_1km")
 
 # Villes du Bénin (pour filtrer les données)
 BENIN_CITIES = {
@@ -34,35 +45,57 @@ def find_csv_file(directory, pattern):
         return csv_files[0]
     return None
 
-def kelvin_to_celsius(value):
-    """Convertir Kelvin en Celsius (si nécessaire)"""
-    if pd.isna(value) or value == 0:
-        return None
-    # MOD11A2 : valeurs en Kelvin * 50
-    # Formule : (value * 0.02) - 273.15
-    celsius = (value * 0.02) - 273.15
-    return round(celsius, 2)
-
 def find_closest_city(lat, lon):
-    """Trouver la ville la plus proche des coordonnées"""
-    min_distance = float('inf')
-    closest_city = None
-
-    for city, coords in BENIN_CITIES.items():
-        # Distance euclidienne simple
-        distance = ((lat - coords['lat'])**2 + (lon - coords['lon'])**2)**0.5
-        if distance < min_distance:
-            min_distance = distance
-            closest_city = city
-
-    # Si distance > 1 degré (~110km), rejeter
-    if min_distance > 1.0:
-        return None
-
-    return closest_city
-
-def process_temperature_csv():
-    """Convertir CSV température → JSON"""
+    """Trouver la ville la plus proche des coordonnées (None au-delà de MAX_CITY_DISTANCE_KM)"""
+    index = find_closest_cities([lat], [lon])[0]
+    return list(BENIN_CITIES)[index] if index >= 0 else None
+
+def find_closest_cities(lats, lons, index=None):
+    """Version vectorisée de find_closest_city pour des tableaux de coordonnées
+
+    Retourne l'indice (dans BENIN_CITIES) de la ville la plus proche de
+    chaque point en distance haversine, ou -1 au-delà de
+    MAX_CITY_DISTANCE_KM ou pour une coordonnée manquante.
+    """
+    if index is None:
+        index = LocationIndex.from_dict(BENIN_CITIES)
+    closest, _ = index.nearest(lats, lons, max_km=MAX_CITY_DISTANCE_KM)
+    return closest
+
+def find_column(columns, predicate):
+    """Première colonne satisfaisant predicate (ou None)"""
+    return next((col for col in columns if predicate(col)), None)
+
+class CityTemperatureStats:
+    """Agrégats d'une ville mis à jour bloc par bloc (somme, min, max, dernières dates)"""
+
+    def __init__(self, keep_last=5):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.last = deque(maxlen=keep_last)
+
+    def add(self, dates, values):
+        """Ajouter des mesures en °C (dans l'ordre du fichier)"""
+        temps = []
+        for date, value in zip(dates, values):
+            temp_celsius = round(value, 2)
+            if temp_celsius:  # 0.00 °C écarté
+                temps.append(temp_celsius)
+                self.last.append({"date": date, "temperature_c": temp_celsius})
+
+        if not temps:
+            return
+
+        # Somme poursuivie dans l'ordre : même résultat que sum() sur toute la série
+        self.total = sum(temps, self.total)
+        self.count += len(temps)
+        self.minimum = min(temps) if self.minimum is None else min(self.minimum, min(temps))
+        self.maximum = max(temps) if self.maximum is None else max(self.maximum, max(temps))
+
+def process_temperature_csv(chunk_rows=CHUNK_ROWS):
+    """Convertir CSV température → JSON (lecture en flux, par blocs de chunk_rows lignes)"""
 
     print("🌡️  Traitement TEMPÉRATURE (MOD11A2)")
     print("=" * 60)
@@ -81,56 +114,52 @@ def process_temperature_csv():
 
     print(f"✅ Fichier trouvé : {csv_file.name}")
 
-    # Lire le CSV
-    df = pd.read_csv(csv_file)
-    print(f"📊 {len(df)} lignes trouvées")
-
-    # Afficher les colonnes pour debug
-    print(f"📋 Colonnes : {list(df.columns)[:5]}...")  # 5 premières colonnes
-
-    # Grouper par ville
-    city_data = {}
-
-    for city in BENIN_CITIES.keys():
-        city_data[city] = {
-            "temperatures": [],
-            "latitude": BENIN_CITIES[city]["lat"],
-            "longitude": BENIN_CITIES[city]["lon"]
-        }
-
-    # Traiter chaque ligne
-    for idx, row in df.iterrows():
-        # Extraire lat/lon (adapter selon vos colonnes CSV)
-        # Les noms de colonnes peuvent varier : 'Latitude', 'lat', 'LAT', etc.
-        lat_col = next((col for col in df.columns if 'lat' in col.lower()), None)
-        lon_col = next((col for col in df.columns if 'lon' in col.lower()), None)
-        date_col = next((col for col in df.columns if 'date' in col.lower()), None)
-
-        if not (lat_col and lon_col and date_col):
-            print("⚠️  Colonnes lat/lon/date non trouvées, colonnes disponibles :")
-            print(f"   {list(df.columns)}")
-            break
-
-        lat = row[lat_col]
-        lon = row[lon_col]
-        date = row[date_col]
-
-        # Trouver ville la plus proche
-        city = find_closest_city(lat, lon)
-
-        if city:
-            # Extraire température (chercher colonne LST_Day)
-            temp_col = next((col for col in df.columns if 'LST_Day' in col or 'LST' in col), None)
-
-            if temp_col:
-                temp_raw = row[temp_col]
-                temp_celsius = kelvin_to_celsius(temp_raw)
-
-                if temp_celsius:
-                    city_data[city]["temperatures"].append({
-                        "date": str(date),
-                        "temperature_c": temp_celsius
-                    })
+    # Colonnes résolues une seule fois sur l'en-tête (les noms varient : 'Latitude', 'lat', 'LAT'...)
+    columns = list(pd.read_csv(csv_file, nrows=0).columns)
+    print(f"📋 Colonnes : {columns[:5]}...")  # 5 premières colonnes
+
+    lat_col = find_column(columns, lambda col: 'lat' in col.lower())
+    lon_col = find_column(columns, lambda col: 'lon' in col.lower())
+    date_col = find_column(columns, lambda col: 'date' in col.lower())
+    temp_col = find_column(columns, lambda col: 'LST_Day' in col or 'LST' in col)
+
+    # Agrégats incrémentaux par ville
+    city_stats = {city: CityTemperatureStats() for city in BENIN_CITIES}
+    city_names = list(BENIN_CITIES.keys())
+    city_index = LocationIndex.from_dict(BENIN_CITIES)
+    num_rows = 0
+
+    if not (lat_col and lon_col and date_col):
+        print("⚠️  Colonnes lat/lon/date non trouvées, colonnes disponibles :")
+        print(f"   {columns}")
+    elif temp_col:
+        # Lecture par blocs : seules 4 colonnes, types compacts
+        reader = pd.read_csv(
+            csv_file,
+            usecols=[lat_col, lon_col, date_col, temp_col],
+            dtype={lat_col: np.float32, lon_col: np.float32, date_col: 'category', temp_col: np.float32},
+            chunksize=chunk_rows
+        )
+
+        for chunk in reader:
+            num_rows += len(chunk)
+
+            # Ville la plus proche de chaque ligne, en une opération
+            closest = find_closest_cities(chunk[lat_col].to_numpy(np.float64),
+                                          chunk[lon_col].to_numpy(np.float64), city_index)
+
+            # Décodage LST en bloc : 0, vide ou hors plage = pas de mesure
+            celsius = LST_CODEC.decode(chunk[temp_col].to_numpy(np.float64))
+            valid = (closest >= 0) & ~np.isnan(celsius)
+
+            dates = chunk[date_col].astype(str).to_numpy()
+
+            # Grouper par ville (ordre des lignes conservé)
+            for k, city in enumerate(city_names):
+                rows = np.flatnonzero(valid & (closest == k))
+                city_stats[city].add(dates[rows].tolist(), celsius[rows].tolist())
+
+    print(f"📊 {num_rows} lignes lues (blocs de {chunk_rows})")
 
     # Créer JSON final
     result = {
@@ -141,22 +170,20 @@ def process_temperature_csv():
         "locations": []
     }
 
-    for city, data in city_data.items():
-        if data["temperatures"]:
-            temps = [t["temperature_c"] for t in data["temperatures"]]
-
+    for city, stats in city_stats.items():
+        if stats.count:
             result["locations"].append({
                 "city": city,
                 "country": "Benin",
-                "latitude": data["latitude"],
-                "longitude": data["longitude"],
+                "latitude": BENIN_CITIES[city]["lat"],
+                "longitude": BENIN_CITIES[city]["lon"],
                 "temperature": {
-                    "average_c": round(sum(temps) / len(temps), 2),
-                    "min_c": round(min(temps), 2),
-                    "max_c": round(max(temps), 2),
-                    "current_c": temps[-1]
+                    "average_c": round(stats.total / stats.count, 2),
+                    "min_c": round(stats.minimum, 2),
+                    "max_c": round(stats.maximum, 2),
+                    "current_c": stats.last[-1]["temperature_c"]
                 },
-                "timeseries": data["temperatures"][-5:]  # 5 dernières dates
+                "timeseries": list(stats.last)  # 5 dernières dates
             })
 
     # Sauvegarder
@@ -192,6 +219,9 @@ def process_all_datasets():
     # process_soil_moisture_csv()
     # process_precipitation_csv()
 
+    # Versions précompressées (.gz/.br) pour le navigateur
+    precompress_outputs([f for f in [temp_file] if f], PRECOMPRESS_MANIFEST)
+
     print("\n" + "=" * 60)
     print("  ✅ CONVERSION TERMINÉE !")
     print("=" * 60)
@@ -9,10 +9,13 @@ Usage:
 import json
 import csv
 from pathlib import Path
+from precompress import precompress_outputs
+from status_classes import NDVI_CLASSES
 
 # Configuration
 DATA_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
 OUTPUT_DIR = Path(r"C:\Projet\ilerise-nasa\public\data\csv")
+PRECOMPRESS_MANIFEST = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json")
 
 def convert_temperature_to_csv():
     """Convertir température JSON → CSV"""
@@ -73,8 +76,11 @@ def convert_ndvi_to_csv():
     with open(json_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
-    # Créer CSV
+    # Créer CSV (codes de statut) et la table des classes ; JSON antérieur
+    # aux codes de statut : classes recalculées depuis les valeurs NDVI
     csv_file = OUTPUT_DIR / "nasa-ndvi-benin.csv"
+    legend = data.get('status_legend') or NDVI_CLASSES.legend()
+    legend_file = write_status_legend_csv(legend, OUTPUT_DIR / "nasa-ndvi-status-legend.csv")
 
     with open(csv_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -82,7 +88,7 @@ def convert_ndvi_to_csv():
         # En-tête
         writer.writerow([
             'City', 'Country', 'Latitude', 'Longitude',
-            'Date', 'NDVI', 'Health_Status', 'Health_Description', 'Color',
+            'Date', 'NDVI', 'Status_Code', 'Color',
             'Raw_Value', 'Average_NDVI', 'Min_NDVI', 'Max_NDVI', 'Current_NDVI'
         ])
 
@@ -98,17 +104,33 @@ def convert_ndvi_to_csv():
             max_ndvi = veg['max_ndvi']
             current_ndvi = veg['current_ndvi']
 
-            for ts in location['timeseries']:
+            timeseries = location['timeseries']
+            codes = NDVI_CLASSES.classify([ts['ndvi'] for ts in timeseries])
+
+            for ts, code in zip(timeseries, codes):
                 writer.writerow([
                     city, country, lat, lon,
-                    ts['date'], ts['ndvi'], ts['status'], ts['health'],
+                    ts['date'], ts['ndvi'], ts.get('status_code', int(code)),
                     location['vegetation_health']['color'],
                     ts.get('raw_value', ''),
                     avg_ndvi, min_ndvi, max_ndvi, current_ndvi
                 ])
 
     print(f"✅ {csv_file.name} créé ({count_rows(csv_file)} lignes)")
-    return csv_file
+    return [csv_file, legend_file] if legend_file else [csv_file]
+
+def write_status_legend_csv(legend, legend_file):
+    """Table code → statut et libellés (status_legend du JSON), None si absente"""
+    if not legend:
+        return None
+
+    legend_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(legend_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(legend[0]))
+        writer.writeheader()
+        writer.writerows(legend)
+
+    return legend_file
 
 def create_summary_csv():
     """Créer CSV résumé avec données actuelles seulement"""
@@ -195,14 +217,17 @@ if __name__ == "__main__":
     print("📊 Conversion des données NASA...\n")
 
     # Convertir température
-    convert_temperature_to_csv()
+    outputs = [convert_temperature_to_csv()]
 
     # Convertir NDVI
-    convert_ndvi_to_csv()
+    outputs += convert_ndvi_to_csv() or []
 
     # Créer résumé
     print("\n📋 Création fichier résumé...\n")
-    create_summary_csv()
+    outputs.append(create_summary_csv())
+
+    # Versions précompressées (.gz/.br) pour le navigateur
+    precompress_outputs([f for f in outputs if f], PRECOMPRESS_MANIFEST)
 
     print("\n" + "=" * 60)
     print("  ✅ CONVERSION TERMINÉE !")
@@ -4,21 +4,40 @@ Pour le projet IleRise - NASA Space Apps Challenge 2025
 
 Usage:
     python convert_nasa_geotiff.py
+    python convert_nasa_geotiff.py --shards   # + un fichier par ville
+    python convert_nasa_geotiff.py --zones communes-benin.geojson   # + statistiques par commune
+    python convert_nasa_geotiff.py --dense    # + tous les pixels du Bénin
 
 Requis:
     pip install rasterio numpy
 """
 
-import rasterio
+import argparse
 import numpy as np
 import json
 from pathlib import Path
 import glob
 from datetime import datetime
+from raster_sampling import SamplingPlan
+from sample_manifest import SampleManifest, extraction_signature
+from sample_cube import SampleCube, to_sample_vector
+from sample_store import write_sample_store
+from city_shards import shard_paths, write_city_shards
+from precompress import precompress_outputs
+from dense_grid import extract_dense_grid
+from product_registry import get_codec
+from quality_mask import QualityMask
+from zonal_stats import ZoneMasks, load_zones, write_zonal_json, zonal_timeseries
 
 # Configuration
 INPUT_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\temperature"  # Dossier avec vos GeoTIFF
 OUTPUT_FILE = r"C:\Projet\ilerise-nasa\public\data\nasa-temperature-benin.json"
+MANIFEST_FILE = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\manifest-temperature.json"  # Échantillons déjà extraits
+SAMPLES_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\samples"  # Matrices binaires (mmap)
+SHARDS_DIR = r"C:\Projet\ilerise-nasa\public\data"  # Fichiers par ville (--shards)
+PRECOMPRESS_MANIFEST = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json"  # Sorties déjà compressées (.gz/.br)
+ZONES_OUTPUT_FILE = r"C:\Projet\ilerise-nasa\public\data\nasa-temperature-zones-benin.json"  # Statistiques par zone (--zones)
+DENSE_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\dense"  # Tous les pixels du Bénin (--dense)
 
 # Villes principales du Bénin (coordonnées GPS)
 CITIES = {
@@ -32,50 +51,15 @@ CITIES = {
     "Kandi": {"lat": 11.1342, "lon": 2.9386}
 }
 
-def kelvin_to_celsius(kelvin_value):
-    """Convertir Kelvin en Celsius"""
-    if kelvin_value == 0 or kelvin_value is None or np.isnan(kelvin_value):
-        return None
-    # Les données MODIS sont multipliées par 50 (scale factor = 0.02)
-    # Formule: Celsius = (value * 0.02) - 273.15
-    celsius = (kelvin_value * 0.02) - 273.15
-    return round(celsius, 2)
+# Décodage LST (K × 50 → °C, fill, plage valide) : registre des produits
+LST_CODEC = get_codec("MOD11A2", "LST_Day_1km")
 
-def get_pixel_value(dataset, lon, lat):
-    """Extraire la valeur d'un pixel pour des coordonnées lat/lon"""
-    try:
-        # Rasterio gère automatiquement la transformation
-        # Pour MODIS Sinusoidal, on doit transformer lat/lon -> projection native
-        from rasterio.warp import transform as warp_transform
-        from rasterio.crs import CRS
-
-        # Transformer lat/lon (EPSG:4326) vers la projection du raster
-        xs, ys = warp_transform(
-            CRS.from_epsg(4326),  # Source: WGS84 lat/lon
-            dataset.crs,           # Destination: Sinusoidal
-            [lon],                 # Longitude
-            [lat]                  # Latitude
-        )
-
-        # Convertir coordonnées projetées en pixel row/col
-        row, col = dataset.index(xs[0], ys[0])
-
-        # Vérifier que c'est dans les limites du raster
-        if row < 0 or row >= dataset.height or col < 0 or col >= dataset.width:
-            return None
+def extract_samples(group, plan):
+    """Valeurs brutes valides de chaque ville (None si absente ou rejetée par le QC), dans l'ordre du plan"""
+    values, inside, good = group.sample(plan)
+    valid = inside & good & LST_CODEC.mask(values, group.dataset.nodata)
 
-        # Lire la valeur
-        data = dataset.read(1)
-        value = data[row, col]
-
-        # Vérifier si c'est une valeur valide (pas fill value)
-        if value == dataset.nodata or value == 0:
-            return None
-
-        return value
-    except Exception as e:
-        # print(f"   Erreur extraction pixel: {e}")
-        return None
+    return [value.item() if ok else None for value, ok in zip(values, valid)]
 
 def extract_date_from_filename(filename):
     """Extraire la date du nom de fichier NASA
@@ -98,7 +82,7 @@ def extract_date_from_filename(filename):
         print(f"   Erreur parsing date '{filename}': {e}")
         return None
 
-def process_temperature_data():
+def process_temperature_data(shards=False, zones=None, dense=False, boundary=None):
     """Traiter tous les fichiers GeoTIFF de température"""
 
     print("🔍 Recherche des fichiers GeoTIFF...")
@@ -123,6 +107,21 @@ def process_temperature_data():
             "temperatures": []
         }
 
+    # Plan d'échantillonnage partagé (reprojection des villes une fois par grille)
+    plan = SamplingPlan(CITIES)
+
+    # Couches QC de la même date, lues avec la bande
+    quality = QualityMask("LST_Day_1km")
+
+    # Manifeste des fichiers déjà traités (seuls les nouveaux sont relus)
+    manifest = SampleManifest(MANIFEST_FILE, plan.names,
+                              extraction_signature(CITIES, quality=quality, codec=LST_CODEC))
+
+    # Matrice brute (dates × villes) pour le stockage binaire
+    sample_dates = []
+    sample_rows = []
+    dated_files = []
+
     # Traiter chaque fichier
     for tif_path in sorted(tif_files):
         filename = Path(tif_path).name
@@ -132,24 +131,49 @@ def process_temperature_data():
             print(f"⚠️  Date non trouvée dans {filename}")
             continue
 
-        print(f"📊 Traitement: {filename} ({date})")
-
-        try:
-            with rasterio.open(tif_path) as dataset:
-                for city_name, coords in CITIES.items():
-                    value = get_pixel_value(dataset, coords["lon"], coords["lat"])
-
-                    if value is not None:
-                        temp_celsius = kelvin_to_celsius(value)
-
-                        if temp_celsius is not None:
-                            temperature_data[city_name]["temperatures"].append({
-                                "date": date,
-                                "temperature_c": temp_celsius,
-                                "raw_value": int(value)
-                            })
-        except Exception as e:
-            print(f"❌ Erreur avec {filename}: {e}")
+        dated_files.append((date, tif_path))
+
+        companions = list(quality.companions(tif_path).values())
+        samples = manifest.lookup(tif_path, companions)
+
+        if samples is None:
+            print(f"📊 Traitement: {filename} ({date})")
+
+            try:
+                # Bande et couches QC de la même date, lues par bloc pour toutes les villes
+                with quality.open(tif_path) as group:
+                    samples = extract_samples(group, plan)
+                manifest.store(tif_path, samples, companions)
+            except Exception as e:
+                print(f"❌ Erreur avec {filename}: {e}")
+                continue
+
+        sample_dates.append(date)
+        sample_rows.append(to_sample_vector(samples))
+
+        # Décodage de toutes les villes en une opération
+        temps_celsius = LST_CODEC.decode(sample_rows[-1])
+
+        for city_name, value, temp_celsius in zip(plan.names, samples, temps_celsius):
+            if not np.isnan(temp_celsius):
+                temperature_data[city_name]["temperatures"].append({
+                    "date": date,
+                    "temperature_c": round(float(temp_celsius), 2),
+                    "raw_value": int(value)
+                })
+
+    manifest.prune(tif_files)
+    manifest.save()
+    print(manifest.summary())
+
+    # Échantillons bruts en binaire (réouverture zéro-copie en aval)
+    cube = SampleCube(sample_dates, sample_rows, plan.names)
+    store_file = write_sample_store(
+        SAMPLES_DIR, "modis-lst_day", cube,
+        coordinates=CITIES,
+        attrs={"source": "NASA MODIS MOD11A2.061", "layer": "LST_Day_1km", "unit": "K x 50 (brut)"}
+    )
+    print(f"💾 Échantillons : {store_file}")
 
     # Calculer températures moyennes par ville
     result = {
@@ -195,7 +219,38 @@ def process_temperature_data():
 
     print(f"\n✅ Conversion terminée !")
     print(f"📁 Fichier créé : {output_path}")
+
+    # Fichiers par ville (chargement à la demande)
+    outputs = [output_path]
+    if shards:
+        entries = write_city_shards(SHARDS_DIR, "temperature", {
+            loc["city"]: (loc, [t["date"] for t in loc["timeseries"]])
+            for loc in result["locations"]
+        }, meta={"source": result["source"], "description": result["product"]})
+        outputs += shard_paths(SHARDS_DIR, entries)
+
+    # Statistiques zonales (polygones GeoJSON)
+    if zones:
+        masks = ZoneMasks(*load_zones(zones))
+        zonal = zonal_timeseries(masks, dated_files, LST_CODEC, quality=quality)
+        outputs.append(write_zonal_json(ZONES_OUTPUT_FILE, zonal, meta={
+            "source": result["source"],
+            "product": result["product"],
+            "unit": "°C",
+            "lastUpdate": result["lastUpdate"]
+        }))
+
+    # Grille dense : série de chaque pixel du Bénin
+    if dense:
+        extract_dense_grid(DENSE_DIR, "modis-lst_day", dated_files, LST_CODEC,
+                           boundary=boundary, quality=quality, attrs={"source": result["source"], "unit": "°C"})
+
+    # Versions précompressées pour le navigateur
+    precompress_outputs(outputs, PRECOMPRESS_MANIFEST)
+
     print(f"📊 {len(result['locations'])} villes avec données")
+    print(f"🧭 Reprojections : {plan.reprojections} | Blocs lus : {plan.blocks_read}")
+    print(quality.summary())
 
     # Afficher aperçu
     print("\n📈 Aperçu des températures moyennes :")
@@ -211,7 +266,27 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
 
-    process_temperature_data()
+    parser = argparse.ArgumentParser(description="Conversion NASA GeoTIFF (LST) → JSON")
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="Écrire aussi un fichier par ville et l'index (SHARDS_DIR)"
+    )
+    parser.add_argument(
+        "--zones", metavar="GEOJSON",
+        help="Polygones (communes, départements) : statistiques par zone et par date"
+    )
+    parser.add_argument(
+        "--dense", action="store_true",
+        help="Extraire aussi tous les pixels du Bénin (DENSE_DIR, stockage par blocs)"
+    )
+    parser.add_argument(
+        "--boundary", metavar="GEOJSON",
+        help="Contour du Bénin pour --dense (par défaut : rectangle englobant)"
+    )
+    args = parser.parse_args()
+
+    process_temperature_data(shards=args.shards, zones=args.zones,
+                             dense=args.dense, boundary=args.boundary)
 
     print("\n" + "=" * 60)
     print("  TERMINÉ !")
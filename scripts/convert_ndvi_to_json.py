@@ -5,20 +5,38 @@ IleRise - NASA Space Apps Challenge 2025
 
 Usage:
     python convert_ndvi_to_json.py
+    python convert_ndvi_to_json.py --shards   # + un fichier par ville
+    python convert_ndvi_to_json.py --zones communes-benin.geojson   # + statistiques par commune
+    python convert_ndvi_to_json.py --dense    # + tous les pixels du Bénin
 """
 
-import rasterio
+import argparse
 import numpy as np
 import json
 from pathlib import Path
 import glob
 from datetime import datetime
-from rasterio.warp import transform as warp_transform
-from rasterio.crs import CRS
+from raster_sampling import SamplingPlan
+from sample_manifest import SampleManifest, extraction_signature
+from sample_cube import SampleCube, to_sample_vector
+from sample_store import write_sample_store
+from city_shards import shard_paths, write_city_shards
+from precompress import precompress_outputs
+from dense_grid import extract_dense_grid
+from product_registry import get_codec
+from quality_mask import QualityMask
+from status_classes import NDVI_CLASSES
+from zonal_stats import ZoneMasks, load_zones, write_zonal_json, zonal_timeseries
 
 # Configuration
 INPUT_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\ndvi"
 OUTPUT_FILE = r"C:\Projet\ilerise-nasa\public\data\nasa-ndvi-benin.json"
+MANIFEST_FILE = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\manifest-ndvi.json"
+SAMPLES_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\samples"
+SHARDS_DIR = r"C:\Projet\ilerise-nasa\public\data"
+PRECOMPRESS_MANIFEST = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json"
+ZONES_OUTPUT_FILE = r"C:\Projet\ilerise-nasa\public\data\nasa-ndvi-zones-benin.json"
+DENSE_DIR = r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\dense"
 
 # Villes du Bénin
 CITIES = {
@@ -32,68 +50,19 @@ CITIES = {
     "Kandi": {"lat": 11.1342, "lon": 2.9386}
 }
 
-def convert_ndvi_value(raw_value):
-    """Convertir valeur NDVI brute en valeur normalisée
-
-    MODIS NDVI : valeurs stockées en int16, multipliées par 10000
-    Formule : NDVI = raw_value * 0.0001
-    Plage valide : -1.0 à 1.0
-    """
-    if raw_value is None or raw_value <= -3000:  # Fill value
-        return None
-
-    ndvi = raw_value * 0.0001
-
-    # Limiter à la plage valide
-    if ndvi < -1.0 or ndvi > 1.0:
-        return None
-
-    return round(ndvi, 4)
+# Décodage NDVI (int16 × 10000, fill -3000, plage valide) : registre des produits
+NDVI_CODEC = get_codec("MOD13Q1", "NDVI")
 
 def interpret_ndvi(ndvi_value):
-    """Interpréter la valeur NDVI pour l'agriculteur"""
-    if ndvi_value is None:
-        return {"status": "unknown", "health": "Données manquantes", "color": "gray"}
-
-    if ndvi_value < 0:
-        return {"status": "water", "health": "Eau", "color": "blue"}
-    elif ndvi_value < 0.2:
-        return {"status": "bare", "health": "Sol nu / Très mauvaise", "color": "brown"}
-    elif ndvi_value < 0.4:
-        return {"status": "poor", "health": "Végétation faible", "color": "orange"}
-    elif ndvi_value < 0.6:
-        return {"status": "moderate", "health": "Bonne santé", "color": "lightgreen"}
-    elif ndvi_value < 0.8:
-        return {"status": "good", "health": "Excellente santé", "color": "green"}
-    else:
-        return {"status": "excellent", "health": "Végétation très dense", "color": "darkgreen"}
-
-def get_pixel_value(dataset, lon, lat):
-    """Extraire valeur pixel avec transformation de coordonnées"""
-    try:
-        # Transformer lat/lon vers projection du raster
-        xs, ys = warp_transform(
-            CRS.from_epsg(4326),
-            dataset.crs,
-            [lon],
-            [lat]
-        )
-
-        row, col = dataset.index(xs[0], ys[0])
-
-        if row < 0 or row >= dataset.height or col < 0 or col >= dataset.width:
-            return None
-
-        data = dataset.read(1)
-        value = data[row, col]
+    """Interpréter la valeur NDVI pour l'agriculteur (une valeur ; tableaux : NDVI_CLASSES.classify)"""
+    return NDVI_CLASSES.describe(ndvi_value)
 
-        # Vérifier fill value
-        if dataset.nodata and value == dataset.nodata:
-            return None
+def extract_samples(group, plan):
+    """Valeurs brutes valides de chaque ville (None si absente ou rejetée par le QC), dans l'ordre du plan"""
+    values, inside, good = group.sample(plan)
+    valid = inside & good & NDVI_CODEC.mask(values, group.dataset.nodata)
 
-        return value
-    except:
-        return None
+    return [value.item() if ok else None for value, ok in zip(values, valid)]
 
 def extract_date_from_filename(filename):
     """Extraire date du nom de fichier MODIS
@@ -116,7 +85,7 @@ def extract_date_from_filename(filename):
         print(f"   ⚠️  Erreur parsing date '{filename}': {e}")
         return None
 
-def process_ndvi_data():
+def process_ndvi_data(shards=False, zones=None, dense=False, boundary=None):
     """Traiter fichiers GeoTIFF NDVI"""
 
     print("🌱 Traitement NDVI (Santé Végétation)")
@@ -140,6 +109,21 @@ def process_ndvi_data():
             "ndvi_values": []
         }
 
+    # Plan d'échantillonnage partagé (reprojection des villes une fois par grille)
+    plan = SamplingPlan(CITIES)
+
+    # Couches QC de la même date, lues avec la bande
+    quality = QualityMask("NDVI")
+
+    # Manifeste des fichiers déjà traités (seuls les nouveaux sont relus)
+    manifest = SampleManifest(MANIFEST_FILE, plan.names,
+                              extraction_signature(CITIES, quality=quality, codec=NDVI_CODEC))
+
+    # Matrice brute (dates × villes) pour le stockage binaire
+    sample_dates = []
+    sample_rows = []
+    dated_files = []
+
     # Traiter chaque fichier
     for tif_path in sorted(tif_files):
         filename = Path(tif_path).name
@@ -148,28 +132,51 @@ def process_ndvi_data():
         if not date:
             continue
 
-        print(f"📊 Traitement: {filename} ({date})")
-
-        try:
-            with rasterio.open(tif_path) as dataset:
-                for city_name, coords in CITIES.items():
-                    value = get_pixel_value(dataset, coords["lon"], coords["lat"])
-
-                    if value is not None:
-                        ndvi = convert_ndvi_value(value)
-
-                        if ndvi is not None:
-                            interpretation = interpret_ndvi(ndvi)
-
-                            ndvi_data[city_name]["ndvi_values"].append({
-                                "date": date,
-                                "ndvi": ndvi,
-                                "health": interpretation["health"],
-                                "status": interpretation["status"],
-                                "raw_value": int(value)
-                            })
-        except Exception as e:
-            print(f"❌ Erreur avec {filename}: {e}")
+        dated_files.append((date, tif_path))
+
+        companions = list(quality.companions(tif_path).values())
+        samples = manifest.lookup(tif_path, companions)
+
+        if samples is None:
+            print(f"📊 Traitement: {filename} ({date})")
+
+            try:
+                # Bande et couches QC de la même date, lues par bloc pour toutes les villes
+                with quality.open(tif_path) as group:
+                    samples = extract_samples(group, plan)
+                manifest.store(tif_path, samples, companions)
+            except Exception as e:
+                print(f"❌ Erreur avec {filename}: {e}")
+                continue
+
+        sample_dates.append(date)
+        sample_rows.append(to_sample_vector(samples))
+
+        # Décodage et classes de toutes les villes en une opération
+        ndvi_values = [round(float(v), 4) for v in NDVI_CODEC.decode(sample_rows[-1])]
+        codes = NDVI_CLASSES.classify(ndvi_values).tolist()
+
+        for city_name, value, ndvi, code in zip(plan.names, samples, ndvi_values, codes):
+            if not np.isnan(ndvi):
+                ndvi_data[city_name]["ndvi_values"].append({
+                    "date": date,
+                    "ndvi": ndvi,
+                    "status_code": code,
+                    "raw_value": int(value)
+                })
+
+    manifest.prune(tif_files)
+    manifest.save()
+    print(manifest.summary())
+
+    # Échantillons bruts en binaire (réouverture zéro-copie en aval)
+    cube = SampleCube(sample_dates, sample_rows, plan.names)
+    store_file = write_sample_store(
+        SAMPLES_DIR, "modis-ndvi", cube,
+        coordinates=CITIES,
+        attrs={"source": "NASA MODIS NDVI", "layer": "NDVI", "unit": "NDVI x 10000 (brut)"}
+    )
+    print(f"💾 Échantillons : {store_file}")
 
     # Créer JSON final
     result = {
@@ -178,6 +185,7 @@ def process_ndvi_data():
         "resolution": "250m or 500m",
         "region": "Benin",
         "lastUpdate": datetime.now().strftime("%Y-%m-%d"),
+        "status_legend": NDVI_CLASSES.legend(),
         "locations": [],
         "interpretation": {
             "ranges": {
@@ -225,7 +233,39 @@ def process_ndvi_data():
 
     print(f"\n✅ Conversion terminée !")
     print(f"📁 Fichier créé : {output_path}")
+
+    # Fichiers par ville (chargement à la demande)
+    outputs = [output_path]
+    if shards:
+        entries = write_city_shards(SHARDS_DIR, "ndvi", {
+            loc["city"]: (loc, [t["date"] for t in loc["timeseries"]])
+            for loc in result["locations"]
+        }, meta={"source": result["source"], "description": result["product"],
+                 "status_legend": result["status_legend"]})
+        outputs += shard_paths(SHARDS_DIR, entries)
+
+    # Statistiques zonales (polygones GeoJSON)
+    if zones:
+        masks = ZoneMasks(*load_zones(zones))
+        zonal = zonal_timeseries(masks, dated_files, NDVI_CODEC, quality=quality)
+        outputs.append(write_zonal_json(ZONES_OUTPUT_FILE, zonal, meta={
+            "source": result["source"],
+            "product": result["product"],
+            "unit": "NDVI",
+            "lastUpdate": result["lastUpdate"]
+        }))
+
+    # Grille dense : série de chaque pixel du Bénin
+    if dense:
+        extract_dense_grid(DENSE_DIR, "modis-ndvi", dated_files, NDVI_CODEC,
+                           boundary=boundary, quality=quality, attrs={"source": result["source"], "unit": "NDVI"})
+
+    # Versions précompressées pour le navigateur
+    precompress_outputs(outputs, PRECOMPRESS_MANIFEST)
+
     print(f"📊 {len(result['locations'])} villes avec données")
+    print(f"🧭 Reprojections : {plan.reprojections} | Blocs lus : {plan.blocks_read}")
+    print(quality.summary())
 
     # Aperçu
     print("\n📈 Aperçu santé végétation :")
@@ -243,7 +283,27 @@ if __name__ == "__main__":
     print("  IleRise - NASA Space Apps Challenge 2025")
     print("=" * 60 + "\n")
 
-    process_ndvi_data()
+    parser = argparse.ArgumentParser(description="Conversion NDVI GeoTIFF → JSON")
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="Écrire aussi un fichier par ville et l'index (SHARDS_DIR)"
+    )
+    parser.add_argument(
+        "--zones", metavar="GEOJSON",
+        help="Polygones (communes, départements) : statistiques par zone et par date"
+    )
+    parser.add_argument(
+        "--dense", action="store_true",
+        help="Extraire aussi tous les pixels du Bénin (DENSE_DIR, stockage par blocs)"
+    )
+    parser.add_argument(
+        "--boundary", metavar="GEOJSON",
+        help="Contour du Bénin pour --dense (par défaut : rectangle englobant)"
+    )
+    args = parser.parse_args()
+
+    process_ndvi_data(shards=args.shards, zones=args.zones,
+                      dense=args.dense, boundary=args.boundary)
 
     print("\n" + "=" * 60)
     print("  ✅ TERMINÉ !")
@@ -2,14 +2,29 @@
 """
 Script de conversion SMAP Soil Moisture GeoTIFF -> JSON -> CSV
 NASA Space Apps Challenge 2025
+
+Usage:
+    python convert_smap_soil_moisture.py
+    python convert_smap_soil_moisture.py --workers 16   # extraction parallèle
+    python convert_smap_soil_moisture.py --shards       # + un fichier par ville
 """
 
 import os
+import argparse
 import json
 import csv
 from datetime import datetime, timedelta
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from sample_manifest import SampleManifest, extraction_signature
+from sample_cube import SampleCube, to_sample_vector
+from sample_store import write_sample_store
+from columnar_export import write_partitioned_dataset
+from city_shards import shard_paths, write_city_shards
+from precompress import precompress_outputs
+from product_registry import get_codec
+from status_classes import ThresholdClasses
 
 try:
     from osgeo import gdal
@@ -22,6 +37,15 @@ except ImportError:
 RAW_DATA_DIR = Path("raw-nasa-data/soil-moisture")
 OUTPUT_JSON = Path("public/data/nasa-soil-moisture-benin.json")
 OUTPUT_CSV = Path("public/data/nasa-soil-moisture-benin.csv")
+OUTPUT_LEGEND_CSV = Path("public/data/nasa-soil-moisture-status-legend.csv")
+MANIFEST_FILE = Path("raw-nasa-data/.cache/manifest-soil-moisture.json")
+SAMPLES_DIR = Path("raw-nasa-data/.cache/samples")
+PARQUET_DIR = Path("exports/parquet")
+SHARDS_DIR = Path("public/data")
+PRECOMPRESS_MANIFEST = Path("raw-nasa-data/.cache/precompress.json")
+
+# Décodage sm_rootzone (m³/m³, fill -9999, plage 0-1) : registre des produits
+SM_CODEC = get_codec("SPL4SMGP", "sm_rootzone")
 
 # Coordonnées des 11 villes du Bénin
 BENIN_CITIES = [
@@ -72,7 +96,7 @@ def parse_filename(filename):
 
 
 def extract_value_at_point(dataset, lon, lat):
-    """Extraire valeur du raster à une coordonnée"""
+    """Extraire la valeur brute du raster à une coordonnée (None hors raster)"""
     # Obtenir transformation géographique
     geotransform = dataset.GetGeoTransform()
 
@@ -98,38 +122,84 @@ def extract_value_at_point(dataset, lon, lat):
     if data is None or data.size == 0:
         return None
 
-    value = float(data[0, 0])
+    return float(data[0, 0])
+
+
+# Niveaux d'humidité (%) : seuils 15 / 20 / 25 / 35
+MOISTURE_CLASSES = ThresholdClasses([15, 20, 25, 35], [
+    {"status": "very_dry", "description": "Irrigation urgente recommandée"},
+    {"status": "dry", "description": "Sol sec, irrigation nécessaire"},
+    {"status": "moderate", "description": "Irrigation modérée nécessaire"},
+    {"status": "optimal", "description": "Humidité idéale pour cultures"},
+    {"status": "saturated", "description": "Risque excès d'eau, réduire irrigation"}
+], unknown={"status": "unknown", "description": "Données non disponibles"})
+
+
+def classify_moisture(volumetric):
+    """Classifier les niveaux d'humidité d'un tableau de valeurs m³/m³ → codes (int8)"""
+    return MOISTURE_CLASSES.classify(np.asarray(volumetric, dtype=np.float64) * 100)
+
+
+def extract_file_samples(tif_file):
+    """Extraire les valeurs de toutes les villes pour un fichier TIF
 
-    # Vérifier NoData
-    nodata = band.GetNoDataValue()
-    if nodata is not None and value == nodata:
+    Retourne (file_info, samples) : samples est un tableau float32 compact
+    dans l'ordre de BENIN_CITIES (NaN = pas de donnée), ou None si le fichier
+    est illisible. Fonction de niveau module pour être utilisable par les
+    processus du pool.
+    """
+    # Parser nom fichier
+    file_info = parse_filename(tif_file.name)
+    if not file_info:
         return None
 
-    # Valeurs SMAP en m³/m³ (0-1)
-    # Filtrer valeurs aberrantes
-    if value < 0 or value > 1:
+    raw = np.full(len(BENIN_CITIES), np.nan)
+
+    # Ouvrir raster
+    try:
+        dataset = gdal.Open(str(tif_file))
+        if not dataset:
+            return None
+
+        # Extraire valeurs pour chaque ville
+        for i, city_info in enumerate(BENIN_CITIES):
+            value = extract_value_at_point(
+                dataset,
+                city_info['longitude'],
+                city_info['latitude']
+            )
+
+            if value is not None:
+                raw[i] = value
+
+        # NoData et valeurs aberrantes (hors 0-1 m³/m³) écartés en une opération
+        samples = SM_CODEC.decode(raw, dataset.GetRasterBand(1).GetNoDataValue()).astype(np.float32)
+
+        dataset = None  # Fermer
+
+    except Exception as e:
+        print(f"⚠️ Erreur avec {tif_file.name}: {e}")
         return None
 
-    return value
+    return file_info, samples
 
 
-def classify_moisture(volumetric):
-    """Classifier niveau d'humidité"""
-    percentage = volumetric * 100
-
-    if percentage < 15:
-        return "very_dry"
-    elif percentage < 20:
-        return "dry"
-    elif percentage < 25:
-        return "moderate"
-    elif percentage < 35:
-        return "optimal"
-    else:
-        return "saturated"
-
-
-def process_all_tif_files():
+def iter_file_samples(tif_files, workers=1):
+    """Extraire les échantillons de chaque fichier, en série ou via un pool de processus
+
+    Les résultats sont rendus dans l'ordre de tif_files, quel que soit le mode.
+    """
+    if workers <= 1:
+        for tif_file in tif_files:
+            yield extract_file_samples(tif_file)
+        return
+
+    chunksize = max(1, len(tif_files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(extract_file_samples, tif_files, chunksize=chunksize)
+
+
+def process_all_tif_files(workers=1):
     """Traiter tous les fichiers TIF"""
     print("🔄 Recherche des fichiers TIF...")
 
@@ -139,83 +209,93 @@ def process_all_tif_files():
     tif_files = [f for f in tif_files if '(1)' not in f.name]
 
     print(f"✅ {len(tif_files)} fichiers trouvés")
+    if workers > 1:
+        print(f"⚙️  Extraction parallèle : {workers} processus")
 
     # Dictionnaire pour stocker données par ville
     cities_data = {city['city']: {'info': city, 'timeseries': []} for city in BENIN_CITIES}
 
-    # Traiter chaque fichier
-    for i, tif_file in enumerate(tif_files):
-        if i % 20 == 0:
-            print(f"📊 Traitement {i}/{len(tif_files)}...")
-
-        # Parser nom fichier
-        file_info = parse_filename(tif_file.name)
-        if not file_info:
+    # Manifeste des fichiers déjà traités : seuls les nouveaux sont relus
+    manifest = SampleManifest(MANIFEST_FILE, cities_data.keys(), extraction_signature(
+        {c['city']: {"lat": c['latitude'], "lon": c['longitude']} for c in BENIN_CITIES},
+        codec=SM_CODEC
+    ))
+
+    samples_by_file = {}
+    pending_files = []
+    for tif_file in tif_files:
+        cached = manifest.lookup(tif_file)
+        if cached is None:
+            pending_files.append(tif_file)
             continue
 
-        # Ouvrir raster
-        try:
-            dataset = gdal.Open(str(tif_file))
-            if not dataset:
-                continue
-
-            # Extraire valeurs pour chaque ville
-            for city_name, city_data in cities_data.items():
-                city_info = city_data['info']
-
-                value = extract_value_at_point(
-                    dataset,
-                    city_info['longitude'],
-                    city_info['latitude']
-                )
-
-                if value is not None:
-                    city_data['timeseries'].append({
-                        'date': file_info['date'],
-                        'time': file_info['time'],
-                        'datetime': file_info['datetime'],
-                        'volumetric': round(value, 3),
-                        'percentage': round(value * 100, 1)
-                    })
-
-            dataset = None  # Fermer
-
-        except Exception as e:
-            print(f"⚠️ Erreur avec {tif_file.name}: {e}")
-            continue
+        file_info = parse_filename(tif_file.name)
+        if file_info:
+            samples_by_file[tif_file] = (file_info, to_sample_vector(cached))
 
-    # Agréger par jour (moyenne des mesures 3h)
+    # Extraire les échantillons des fichiers nouveaux ou modifiés
+    results = iter_file_samples(pending_files, workers)
+    for i, (tif_file, result) in enumerate(zip(pending_files, results)):
+        if i % 20 == 0:
+            print(f"📊 Traitement {i}/{len(pending_files)}...")
+
+        if result is not None:
+            samples_by_file[tif_file] = result
+            manifest.store(tif_file, [None if np.isnan(v) else float(v) for v in result[1]])
+
+    manifest.prune(tif_files)
+    manifest.save()
+    print(manifest.summary())
+
+    # Cube temps × villes (float32, NaN = pas de donnée), trié par horodatage
+    file_samples = [samples_by_file[f] for f in tif_files if f in samples_by_file]
+    cube = SampleCube(
+        [file_info['datetime'] for file_info, _ in file_samples],
+        [samples for _, samples in file_samples],
+        cities_data.keys()
+    )
+
+    # Échantillons bruts en binaire (réouverture zéro-copie en aval)
+    store_file = write_sample_store(
+        SAMPLES_DIR, "smap-sm_rootzone-11cities", cube,
+        coordinates={c['city']: {"lat": c['latitude'], "lon": c['longitude']} for c in BENIN_CITIES},
+        attrs={"source": "SMAP SPL4SMGP.008", "layer": "sm_rootzone", "unit": "m³/m³"}
+    )
+    print(f"💾 Échantillons : {store_file}")
+
+    # Agréger par jour (moyenne des mesures 3h, réduction vectorisée)
     print("📅 Agrégation par jour...")
-    for city_name, city_data in cities_data.items():
-        # Grouper par date
-        daily_data = {}
-        for entry in city_data['timeseries']:
-            date = entry['date']
-            if date not in daily_data:
-                daily_data[date] = []
-            daily_data[date].append(entry)
-
-        # Calculer moyenne journalière
-        daily_avg = []
-        for date, entries in sorted(daily_data.items()):
-            values = [e['volumetric'] for e in entries]
-            avg_vol = np.mean(values)
-            daily_avg.append({
-                'date': date,
-                'value': round(avg_vol, 3),
-                'percent': round(avg_vol * 100, 1)
-            })
-
-        city_data['timeseries'] = daily_avg
+    days, daily_means = cube.daily_mean(decimals=3)
+    daily_values = np.round(daily_means, 3)
+    daily_percents = np.round(daily_means * 100, 1)
+    daily_codes = classify_moisture(daily_values)
+    day_labels = np.datetime_as_string(days, unit='D')
+
+    # Valeur actuelle = dernier jour avec mesure, réduction du cube journalier
+    current_values, current_days = SampleCube(days, daily_values, cities_data.keys()).latest()
+    current_codes = classify_moisture(current_values)
+
+    for i, city_data in enumerate(cities_data.values()):
+        valid_days = np.flatnonzero(~np.isnan(daily_means[:, i]))
+        city_data['timeseries'] = [
+            {
+                'date': str(day_labels[d]),
+                'value': float(daily_values[d, i]),
+                'percent': float(daily_percents[d, i])
+            }
+            for d in valid_days
+        ]
+        # Codes de statut alignés sur la série (CSV / Parquet)
+        city_data['status_codes'] = daily_codes[valid_days, i]
 
         # Valeur actuelle = dernière date
-        if daily_avg:
-            latest = daily_avg[-1]
+        if not np.isnan(current_values[i]):
+            volumetric = round(float(current_values[i]), 3)
             city_data['current'] = {
-                'volumetric': latest['value'],
-                'percentage': latest['percent'],
-                'status': classify_moisture(latest['value']),
-                'timestamp': f"{latest['date']}T12:00:00Z"
+                'volumetric': volumetric,
+                'percentage': round(volumetric * 100, 1),
+                'status': str(MOISTURE_CLASSES.statuses(current_codes[i])),
+                'timestamp': f"{np.datetime_as_string(current_days[i], unit='D')}T12:00:00Z"
             }
         else:
             city_data['current'] = {
@@ -228,6 +308,36 @@ def process_all_tif_files():
     return cities_data
 
 
+def build_location_entry(city_data):
+    """Entrée JSON d'une ville (30 derniers jours)"""
+    return {
+        "city": city_data['info']['city'],
+        "latitude": city_data['info']['latitude'],
+        "longitude": city_data['info']['longitude'],
+        "region": city_data['info']['region'],
+        "soil_type": city_data['info']['soil_type'],
+        "current": city_data['current'],
+        "timeseries": city_data['timeseries'][-30:] if len(city_data['timeseries']) > 30 else city_data['timeseries']  # Garder 30 derniers jours
+    }
+
+
+def create_city_shards(cities_data):
+    """Créer un fichier par ville et mettre à jour l'index"""
+    print("🗂️  Création des fichiers par ville...")
+
+    city_shards = {}
+    for city_name, city_data in sorted(cities_data.items()):
+        entry = build_location_entry(city_data)
+        city_shards[entry['city']] = (entry, [ts['date'] for ts in entry['timeseries']])
+
+    entries = write_city_shards(SHARDS_DIR, "soil-moisture", city_shards, meta={
+        "source": "NASA SMAP Level 4 Global Surface and Root Zone Soil Moisture",
+        "description": "Root zone soil moisture (0-100 cm depth) - averaged daily"
+    })
+
+    return shard_paths(SHARDS_DIR, entries)
+
+
 def create_json_output(cities_data):
     """Créer fichier JSON"""
     print("📝 Création du JSON...")
@@ -269,17 +379,7 @@ def create_json_output(cities_data):
 
     # Ajouter données de chaque ville
     for city_name, city_data in sorted(cities_data.items()):
-        location_entry = {
-            "city": city_data['info']['city'],
-            "latitude": city_data['info']['latitude'],
-            "longitude": city_data['info']['longitude'],
-            "region": city_data['info']['region'],
-            "soil_type": city_data['info']['soil_type'],
-            "current": city_data['current'],
-            "timeseries": city_data['timeseries'][-30:] if len(city_data['timeseries']) > 30 else city_data['timeseries']  # Garder 30 derniers jours
-        }
-
-        output['layers']['sm_surface']['locations'].append(location_entry)
+        output['layers']['sm_surface']['locations'].append(build_location_entry(city_data))
 
     # Écrire JSON
     OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
@@ -296,7 +396,7 @@ def create_csv_output(cities_data):
     # Préparer données
     rows = []
     for city_name, city_data in sorted(cities_data.items()):
-        for entry in city_data['timeseries']:
+        for entry, code in zip(city_data['timeseries'], city_data['status_codes'].tolist()):
             rows.append({
                 'date': entry['date'],
                 'city': city_data['info']['city'],
@@ -306,7 +406,7 @@ def create_csv_output(cities_data):
                 'soil_type': city_data['info']['soil_type'],
                 'soil_moisture_volumetric': entry['value'],
                 'soil_moisture_percent': entry['percent'],
-                'status': classify_moisture(entry['value'])
+                'status_code': code
             })
 
     # Écrire CSV
@@ -318,11 +418,49 @@ def create_csv_output(cities_data):
             writer.writeheader()
             writer.writerows(rows)
 
-    print(f"✅ CSV créé: {OUTPUT_CSV}")
+    # Table des classes (codes status_code), écrite une fois
+    legend = MOISTURE_CLASSES.legend()
+    with open(OUTPUT_LEGEND_CSV, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(legend[0]))
+        writer.writeheader()
+        writer.writerows(legend)
+
+    print(f"✅ CSV créé: {OUTPUT_CSV} (classes : {OUTPUT_LEGEND_CSV.name})")
     print(f"📈 {len(rows)} lignes de données")
 
 
-def main():
+def create_parquet_output(cities_data):
+    """Créer l'export Parquet partitionné par année"""
+    print("🗃️  Création du Parquet...")
+
+    columns = {name: [] for name in (
+        'date', 'city', 'region', 'soil_type', 'latitude', 'longitude',
+        'soil_moisture_volumetric', 'soil_moisture_percent', 'status'
+    )}
+
+    for city_name, city_data in sorted(cities_data.items()):
+        info = city_data['info']
+        for entry in city_data['timeseries']:
+            columns['date'].append(entry['date'])
+            columns['city'].append(info['city'])
+            columns['region'].append(info['region'])
+            columns['soil_type'].append(info['soil_type'])
+            columns['latitude'].append(info['latitude'])
+            columns['longitude'].append(info['longitude'])
+            columns['soil_moisture_volumetric'].append(entry['value'])
+            columns['soil_moisture_percent'].append(entry['percent'])
+        columns['status'].extend(MOISTURE_CLASSES.statuses(city_data['status_codes']).tolist())
+
+    num_rows = write_partitioned_dataset(
+        PARQUET_DIR, "soil-moisture-daily", columns,
+        float_columns=['soil_moisture_volumetric', 'soil_moisture_percent'],
+        dictionary_columns=['city', 'region', 'soil_type', 'status']
+    )
+    if num_rows is not None:
+        print(f"✅ Parquet créé: {PARQUET_DIR} ({num_rows} lignes)")
+
+
+def main(workers=1, shards=False):
     print("=" * 60)
     print("🌍 Conversion SMAP Soil Moisture TIF → JSON → CSV")
     print("=" * 60)
@@ -333,7 +471,7 @@ def main():
         return
 
     # Traiter TIF
-    cities_data = process_all_tif_files()
+    cities_data = process_all_tif_files(workers)
 
     # Créer JSON
     create_json_output(cities_data)
@@ -341,6 +479,17 @@ def main():
     # Créer CSV
     create_csv_output(cities_data)
 
+    # Créer Parquet (colonnaire, partitionné par année)
+    create_parquet_output(cities_data)
+
+    # Fichiers par ville (chargement à la demande)
+    outputs = [OUTPUT_JSON, OUTPUT_CSV, OUTPUT_LEGEND_CSV]
+    if shards:
+        outputs += create_city_shards(cities_data)
+
+    # Versions précompressées (.gz/.br) pour le navigateur
+    precompress_outputs(outputs, PRECOMPRESS_MANIFEST)
+
     print("\n✅ Conversion terminée !")
     print(f"📁 JSON: {OUTPUT_JSON}")
     print(f"📁 CSV: {OUTPUT_CSV}")
@@ -353,4 +502,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Conversion SMAP Soil Moisture TIF → JSON → CSV")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Nombre de processus pour l'extraction (défaut : 1, séquentiel)"
+    )
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="Écrire aussi un fichier par ville et l'index (SHARDS_DIR)"
+    )
+    args = parser.parse_args()
+
+    main(workers=args.workers, shards=args.shards)
@@ -4,22 +4,43 @@ IleRise - NASA Space Apps Challenge 2025
 
 Usage:
     python convert_smap_to_json.py
+    python convert_smap_to_json.py --pretty   # JSON indenté (débogage)
+    python convert_smap_to_json.py --shards   # + un fichier par ville
+    python convert_smap_to_json.py --zones communes-benin.geojson   # + statistiques par commune
+    python convert_smap_to_json.py --dense    # + tous les pixels du Bénin
 """
 
 import rasterio
-from rasterio.warp import transform as warp_transform
-from rasterio.crs import CRS
+import argparse
 import json
 import csv
 from pathlib import Path
 from datetime import datetime
 import re
 import numpy as np
+from raster_sampling import SamplingPlan
+from sample_manifest import SampleManifest, extraction_signature
+from sample_cube import SampleCube, to_sample_vector
+from sample_store import write_sample_store
+from columnar_export import write_partitioned_dataset
+from json_stream import write_json_stream
+from city_shards import shard_paths, write_city_shards
+from precompress import precompress_outputs
+from product_registry import get_codec
+from status_classes import SOIL_MOISTURE_CLASSES
+from dense_grid import extract_dense_grid
+from zonal_stats import ZoneMasks, load_zones, write_zonal_json, zonal_timeseries
 
 # Configuration
 RAW_DATA_DIR = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\soil-moisture")
 OUTPUT_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
 CSV_DIR = Path(r"C:\Projet\ilerise-nasa\public\data\csv")
+MANIFEST_FILE = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\manifest-smap.json")
+SAMPLES_DIR = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\samples")
+PARQUET_DIR = Path(r"C:\Projet\ilerise-nasa\exports\parquet")
+SHARDS_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
+PRECOMPRESS_MANIFEST = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json")
+DENSE_DIR = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\dense")
 
 # Villes du Bénin
 CITIES = {
@@ -33,97 +54,63 @@ CITIES = {
     "Kandi": {"lat": 11.1342, "lon": 2.9386}
 }
 
+SMAP_PRODUCT = "SPL4SMGP"
+
 # Couches SMAP prioritaires
 PRIORITY_LAYERS = [
     "sm_surface",      # Humidité surface (0-5cm)
     "sm_rootzone"      # Humidité zone racinaire (0-100cm)
 ]
 
-def get_pixel_value(dataset, lon, lat):
-    """Extraire la valeur d'un pixel pour des coordonnées lat/lon"""
-    try:
-        # Transformer coordonnées WGS84 vers projection du dataset
-        xs, ys = warp_transform(
-            CRS.from_epsg(4326),  # Source: WGS84
-            dataset.crs,          # Destination: projection SMAP
-            [lon],
-            [lat]
-        )
+def smap_codec(layer_name):
+    """Décodage de la couche (m³/m³, fill -9999, plage 0-1) : registre des produits"""
+    return get_codec(SMAP_PRODUCT, layer_name)
 
-        # Obtenir indices de pixel
-        row, col = dataset.index(xs[0], ys[0])
+class SmapPercent:
+    """Décodeur d'une couche en % (NaN si invalide), pour les modes zonal et dense
 
-        # Lire la valeur
-        window = rasterio.windows.Window(col, row, 1, 1)
-        data = dataset.read(1, window=window)
+    Objet de module : transmis tel quel aux processus de travail.
+    """
 
-        value = data[0, 0]
+    def __init__(self, layer_name):
+        self.layer_name = layer_name
 
-        # Valeurs invalides SMAP
-        if value == dataset.nodata or np.isnan(value) or value < 0 or value > 1:
-            return None
+    def __call__(self, raw, dataset):
+        return smap_codec(self.layer_name)(raw, dataset) * 100
 
-        return value
+def extract_samples(dataset, plan, codec):
+    """Valeurs brutes valides de chaque ville (None si absente), dans l'ordre du plan"""
+    values, inside = plan.sample(dataset)
+    valid = inside & codec.mask(values, dataset.nodata)
 
-    except Exception as e:
-        return None
+    return [value.item() if ok else None for value, ok in zip(values, valid)]
 
-def convert_smap_value(raw_value):
-    """Convertir valeur SMAP en pourcentage"""
-    if raw_value is None:
-        return None
+def interpret_soil_moisture(moisture_percent):
+    """Interpréter humidité du sol pour agriculteurs (une valeur ; tableaux : SOIL_MOISTURE_CLASSES.classify)"""
+    return SOIL_MOISTURE_CLASSES.describe(moisture_percent)
 
-    # SMAP valeurs en m³/m³ (0.0 - 1.0)
-    # Convertir en pourcentage
-    percentage = round(raw_value * 100, 2)
+class SoilMoistureSeries:
+    """Série (date, humidité %) d'une ville
 
-    return percentage
+    Les statuts de toute la série sont classés en une opération ; chaque
+    entrée ne porte que son code (status_code), les libellés sont dans la
+    table "status_legend" écrite une fois par fichier.
+    """
 
-def interpret_soil_moisture(moisture_percent):
-    """Interpréter humidité du sol pour agriculteurs"""
-    if moisture_percent is None:
-        return {
-            "status": "unknown",
-            "description": "Données non disponibles",
-            "recommendation": "Vérifier manuellement",
-            "color": "gray"
-        }
-
-    if moisture_percent < 10:
-        return {
-            "status": "very_dry",
-            "description": "Sol très sec",
-            "recommendation": "Irrigation urgente nécessaire",
-            "color": "brown"
-        }
-    elif moisture_percent < 20:
-        return {
-            "status": "dry",
-            "description": "Sol sec",
-            "recommendation": "Irrigation recommandée",
-            "color": "orange"
-        }
-    elif moisture_percent < 30:
-        return {
-            "status": "moderate",
-            "description": "Humidité modérée",
-            "recommendation": "Surveiller, irrigation possible",
-            "color": "yellow"
-        }
-    elif moisture_percent < 40:
-        return {
-            "status": "good",
-            "description": "Bonne humidité",
-            "recommendation": "Niveau optimal pour la plupart des cultures",
-            "color": "lightgreen"
-        }
-    else:
-        return {
-            "status": "saturated",
-            "description": "Sol saturé",
-            "recommendation": "Risque d'excès d'eau, drainage nécessaire",
-            "color": "blue"
-        }
+    def __init__(self, points):
+        self.points = points
+        self.codes = SOIL_MOISTURE_CLASSES.classify([moisture for _, moisture in points])
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        for (date, moisture_percent), code in zip(self.points, self.codes.tolist()):
+            yield {
+                "date": date,
+                "moisture_percent": moisture_percent,
+                "status_code": code
+            }
 
 def extract_date_from_filename(filename):
     """Extraire date du nom de fichier AppEEARS"""
@@ -143,6 +130,22 @@ def extract_date_from_filename(filename):
     except:
         return None
 
+def extract_timestamp_from_filename(filename):
+    """Extraire date et heure (ISO) du nom de fichier : doyAAAAJJJHHMMSS"""
+    try:
+        date_part = filename.split('_doy')[1].split('_')[0]
+
+        timestamp = datetime.strptime(date_part[:7], "%Y%j")
+        if len(date_part) >= 13:
+            timestamp = timestamp.replace(
+                hour=int(date_part[7:9]),
+                minute=int(date_part[9:11]),
+                second=int(date_part[11:13])
+            )
+        return timestamp.strftime("%Y-%m-%dT%H:%M:%S")
+    except:
+        return None
+
 def identify_layer_type(filename):
     """Identifier le type de couche SMAP"""
     filename_lower = filename.lower()
@@ -153,8 +156,14 @@ def identify_layer_type(filename):
 
     return "other"
 
-def process_smap_data():
-    """Traiter tous les fichiers SMAP"""
+def process_smap_data(pretty=False, shards=False, zones=None, dense=False, boundary=None):
+    """Traiter tous les fichiers SMAP
+
+    pretty : JSON indenté (débogage) au lieu du format compact servi au jeu
+    shards : écrire aussi un fichier par ville et l'index
+    zones : GeoJSON de polygones, statistiques par zone pour chaque couche
+    dense : extraire aussi tous les pixels du Bénin (contour boundary)
+    """
 
     print("\n" + "=" * 60)
     print("  CONVERSION SMAP → JSON")
@@ -192,7 +201,15 @@ def process_smap_data():
         print(f"   {layer:20} : {count} fichiers")
 
     if other_files:
-        print(f"   Autres couches         : {len(other_files)} fichiers (ignorés)")
+        print(f"   Autres couches         : {len(other_files)} fichiers (ignorés, voir multi_layer.py)")
+
+    # Plan d'échantillonnage partagé entre couches (même grille SMAP)
+    plan = SamplingPlan(CITIES)
+
+    # Manifeste des fichiers déjà traités (seuls les nouveaux sont relus)
+    manifest = SampleManifest(MANIFEST_FILE, plan.names, extraction_signature(
+        CITIES, codec={layer: smap_codec(layer) for layer in PRIORITY_LAYERS}
+    ))
 
     # Traiter chaque couche prioritaire
     results = {}
@@ -208,18 +225,34 @@ def process_smap_data():
         print(f"  Traitement : {layer.upper()}")
         print(f"{'=' * 60}")
 
-        layer_data = process_layer(layer, files)
+        layer_data = process_layer(layer, files, plan, manifest)
         if layer_data:
             results[layer] = layer_data
 
+    manifest.prune([f for layer in PRIORITY_LAYERS for f in layer_files[layer]])
+    manifest.save()
+
+    print(f"\n🧭 Reprojections : {plan.reprojections} | Blocs lus : {plan.blocks_read}")
+    print(manifest.summary())
+
     # Créer fichiers de sortie
     if results:
-        create_json_output(results)
-        create_csv_output(results)
+        outputs = [create_json_output(results, pretty)]
+        if shards:
+            outputs += create_city_shards(results, pretty)
+        outputs += create_csv_output(results)
+        create_parquet_output(results)
+        if zones:
+            outputs += create_zonal_outputs(zones, layer_files, pretty)
+        if dense:
+            create_dense_grids(layer_files, boundary)
+
+        # Versions précompressées (.gz/.br) pour le navigateur
+        precompress_outputs(outputs, PRECOMPRESS_MANIFEST)
     else:
         print("\n❌ Aucune donnée extraite")
 
-def process_layer(layer_name, files):
+def process_layer(layer_name, files, plan, manifest):
     """Traiter une couche SMAP spécifique"""
 
     layer_data = {
@@ -232,6 +265,13 @@ def process_layer(layer_name, files):
 
     # Structure pour stocker données par ville
     city_data = {city: {"dates": []} for city in CITIES.keys()}
+    codec = smap_codec(layer_name)
+
+    # Matrices (horodatages × villes) : brute pour le stockage binaire,
+    # en % arrondi pour les statistiques par ville
+    sample_times = []
+    sample_rows = []
+    percent_rows = []
 
     # Traiter chaque fichier
     for file_path in files:
@@ -243,48 +283,67 @@ def process_layer(layer_name, files):
 
         print(f"\n   📅 {date} - {file_path.name}")
 
-        try:
-            with rasterio.open(file_path) as dataset:
-                print(f"      Projection : {dataset.crs}")
-
-                for city_name, coords in CITIES.items():
-                    raw_value = get_pixel_value(dataset, coords['lon'], coords['lat'])
-                    moisture_percent = convert_smap_value(raw_value)
-
-                    if moisture_percent is not None:
-                        interpretation = interpret_soil_moisture(moisture_percent)
-
-                        city_data[city_name]["dates"].append({
-                            "date": date,
-                            "moisture_percent": moisture_percent,
-                            "status": interpretation["status"],
-                            "description": interpretation["description"],
-                            "recommendation": interpretation["recommendation"]
-                        })
-
-                        print(f"      ✅ {city_name:15} : {moisture_percent:5.1f}% - {interpretation['status']}")
-                    else:
-                        print(f"      ⚠️  {city_name:15} : Pas de données")
-
-        except Exception as e:
-            print(f"      ❌ Erreur : {e}")
+        samples = manifest.lookup(file_path)
+
+        if samples is None:
+            try:
+                with rasterio.open(file_path) as dataset:
+                    print(f"      Projection : {dataset.crs}")
+
+                    # Lecture groupée par bloc pour toutes les villes
+                    samples = extract_samples(dataset, plan, codec)
+                manifest.store(file_path, samples)
+            except Exception as e:
+                print(f"      ❌ Erreur : {e}")
+                continue
+
+        sample_times.append(extract_timestamp_from_filename(file_path.name) or date)
+        sample_rows.append(to_sample_vector(samples))
+
+        # m³/m³ → % puis classes, pour toutes les villes en une opération
+        moisture_values = [round(float(v), 2) for v in codec.decode(sample_rows[-1]) * 100]
+        statuses = SOIL_MOISTURE_CLASSES.statuses(SOIL_MOISTURE_CLASSES.classify(moisture_values))
+        percent_rows.append(moisture_values)
+
+        for city_name, moisture_percent, status in zip(plan.names, moisture_values, statuses):
+            if not np.isnan(moisture_percent):
+                city_data[city_name]["dates"].append((date, moisture_percent))
+
+                print(f"      ✅ {city_name:15} : {moisture_percent:5.1f}% - {status}")
+            else:
+                print(f"      ⚠️  {city_name:15} : Pas de données")
+
+    # Échantillons bruts en binaire (réouverture zéro-copie en aval)
+    cube = SampleCube(sample_times, sample_rows, plan.names)
+    store_file = write_sample_store(
+        SAMPLES_DIR, f"smap-{layer_name}", cube,
+        coordinates=CITIES,
+        attrs={"source": "SMAP SPL4SMGP.008", "layer": layer_name, "unit": "m³/m³"}
+    )
+    print(f"\n   💾 Échantillons : {store_file}")
+
+    # Valeur actuelle, min et max de toutes les villes : réductions du cube
+    percents = SampleCube(sample_times, percent_rows, plan.names)
+    current_values, _ = percents.latest()
+    min_values = percents.minimum()
+    max_values = percents.maximum()
 
     # Calculer statistiques par ville
-    for city_name, coords in CITIES.items():
+    for i, (city_name, coords) in enumerate(CITIES.items()):
         dates_data = city_data[city_name]["dates"]
 
         if not dates_data:
             continue
 
         # Trier par date
-        dates_data.sort(key=lambda x: x["date"])
+        dates_data.sort(key=lambda x: x[0])
 
         # Calculer moyennes
-        moisture_values = [d["moisture_percent"] for d in dates_data]
+        moisture_values = [moisture for _, moisture in dates_data]
         avg_moisture = sum(moisture_values) / len(moisture_values)
-        min_moisture = min(moisture_values)
-        max_moisture = max(moisture_values)
-        current_moisture = moisture_values[-1]  # Dernière valeur
+        min_moisture = float(min_values[i])
+        max_moisture = float(max_values[i])
+        current_moisture = round(float(current_values[i]), 2)  # Dernière valeur
 
         layer_data["locations"].append({
             "city": city_name,
@@ -298,7 +357,7 @@ def process_layer(layer_name, files):
                 "max_percent": round(max_moisture, 2)
             },
             "current_status": interpret_soil_moisture(current_moisture),
-            "timeseries": dates_data
+            "timeseries": SoilMoistureSeries(dates_data)
         })
 
     cities_with_data = len(layer_data["locations"])
@@ -308,20 +367,18 @@ def process_layer(layer_name, files):
 
 def get_layer_description(layer_name):
     """Description de la couche SMAP"""
-    descriptions = {
-        "sm_surface": "Humidité du sol en surface (0-5cm)",
-        "sm_rootzone": "Humidité du sol en zone racinaire (0-100cm)"
-    }
-    return descriptions.get(layer_name, layer_name)
+    codec = smap_codec(layer_name)
+    return codec.description if codec else layer_name
 
-def create_json_output(results):
-    """Créer fichier JSON de sortie"""
+def create_json_output(results, pretty=False):
+    """Créer fichier JSON de sortie (écrit en flux, compact par défaut)"""
 
     output_data = {
         "source": "SMAP SPL4SMGP.008",
         "product": "Soil Moisture",
         "region": "Benin",
         "lastUpdate": datetime.now().strftime("%Y-%m-%d"),
+        "status_legend": SOIL_MOISTURE_CLASSES.legend(),
         "layers": results
     }
 
@@ -329,7 +386,7 @@ def create_json_output(results):
     json_file.parent.mkdir(parents=True, exist_ok=True)
 
     with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+        write_json_stream(f, output_data, pretty=pretty, float_digits=4)
 
     print(f"\n{'=' * 60}")
     print(f"✅ JSON créé : {json_file}")
@@ -345,11 +402,73 @@ def create_json_output(results):
             status = loc["current_status"]["status"]
             print(f"      {city:20} : {current:5.1f}% - {status}")
 
+    return json_file
+
+def create_city_shards(results, pretty=False):
+    """Créer un fichier par ville (toutes couches) et mettre à jour l'index"""
+
+    city_shards = {}
+    for layer_name, layer_data in results.items():
+        for location in layer_data["locations"]:
+            payload, dates = city_shards.setdefault(location["city"], ({"layers": {}}, []))
+            payload["layers"][layer_name] = location
+            dates.extend(date for date, _ in location["timeseries"].points)
+
+    entries = write_city_shards(SHARDS_DIR, "smap", city_shards, meta={
+        "source": "SMAP SPL4SMGP.008",
+        "description": "Soil Moisture",
+        "status_legend": SOIL_MOISTURE_CLASSES.legend()
+    }, pretty=pretty)
+
+    return shard_paths(SHARDS_DIR, entries)
+
+def create_zonal_outputs(zones, layer_files, pretty=False):
+    """Statistiques zonales de chaque couche (zones rastérisées une fois pour la grille SMAP)"""
+
+    masks = ZoneMasks(*load_zones(zones))
+    zone_files = []
+
+    for layer_name in PRIORITY_LAYERS:
+        dated_files = dated_layer_files(layer_files[layer_name])
+        if not dated_files:
+            continue
+
+        zonal = zonal_timeseries(masks, dated_files, SmapPercent(layer_name))
+        zone_files.append(write_zonal_json(OUTPUT_DIR / f"nasa-smap-{layer_name}-zones-benin.json", zonal, meta={
+            "source": "SMAP SPL4SMGP.008",
+            "layer": layer_name,
+            "description": get_layer_description(layer_name),
+            "unit": "percent",
+            "lastUpdate": datetime.now().strftime("%Y-%m-%d")
+        }, pretty=pretty))
+
+    print(f"🗺️  Rastérisations des zones : {masks.rasterizations}")
+
+    return zone_files
+
+def dated_layer_files(files):
+    """[(horodatage, chemin)] des fichiers d'une couche dont la date est lisible"""
+    dated_files = []
+    for file_path in sorted(files):
+        date = extract_date_from_filename(file_path.name)
+        if date:
+            dated_files.append((extract_timestamp_from_filename(file_path.name) or date, file_path))
+    return dated_files
+
+def create_dense_grids(layer_files, boundary=None):
+    """Série de chaque pixel du Bénin pour chaque couche (stockage par blocs)"""
+
+    for layer_name in PRIORITY_LAYERS:
+        extract_dense_grid(DENSE_DIR, f"smap-{layer_name}", dated_layer_files(layer_files[layer_name]),
+                           SmapPercent(layer_name), boundary=boundary,
+                           attrs={"source": "SMAP SPL4SMGP.008", "layer": layer_name, "unit": "percent"})
+
 def create_csv_output(results):
-    """Créer fichier CSV de sortie"""
+    """Créer fichier CSV de sortie (codes de statut) et sa table de classes"""
 
     csv_file = CSV_DIR / "nasa-smap-benin.csv"
     csv_file.parent.mkdir(parents=True, exist_ok=True)
+    legend_file = write_status_legend_csv(CSV_DIR / "nasa-smap-status-legend.csv")
 
     with open(csv_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -357,8 +476,7 @@ def create_csv_output(results):
         # En-tête
         writer.writerow([
             'Layer', 'Layer_Description', 'City', 'Country',
-            'Latitude', 'Longitude', 'Date', 'Moisture_Percent',
-            'Status', 'Description', 'Recommendation',
+            'Latitude', 'Longitude', 'Date', 'Moisture_Percent', 'Status_Code',
             'Current_Percent', 'Average_Percent', 'Min_Percent', 'Max_Percent'
         ])
 
@@ -377,8 +495,7 @@ def create_csv_output(results):
                     writer.writerow([
                         layer_name, layer_desc, city, country,
                         lat, lon,
-                        ts["date"], ts["moisture_percent"],
-                        ts["status"], ts["description"], ts["recommendation"],
+                        ts["date"], ts["moisture_percent"], ts["status_code"],
                         moisture_stats["current_percent"],
                         moisture_stats["average_percent"],
                         moisture_stats["min_percent"],
@@ -386,7 +503,45 @@ def create_csv_output(results):
                     ])
 
     num_rows = sum(1 for _ in open(csv_file, encoding='utf-8')) - 1
-    print(f"✅ CSV créé : {csv_file.name} ({num_rows} lignes)")
+    print(f"✅ CSV créé : {csv_file.name} ({num_rows} lignes, classes dans {legend_file.name})")
+
+    return [csv_file, legend_file]
+
+def write_status_legend_csv(legend_file):
+    """Table code → statut, description, recommandation, couleur"""
+    legend = SOIL_MOISTURE_CLASSES.legend()
+
+    with open(legend_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(legend[0]))
+        writer.writeheader()
+        writer.writerows(legend)
+
+    return legend_file
+
+def create_parquet_output(results):
+    """Créer l'export Parquet (une partition par couche et par année)"""
+
+    for layer_name, layer_data in results.items():
+        columns = {"city": [], "latitude": [], "longitude": [],
+                   "date": [], "moisture_percent": [], "status": []}
+
+        for location in layer_data["locations"]:
+            series = location["timeseries"]
+            for date, moisture_percent in series.points:
+                columns["city"].append(location["city"])
+                columns["latitude"].append(location["latitude"])
+                columns["longitude"].append(location["longitude"])
+                columns["date"].append(date)
+                columns["moisture_percent"].append(moisture_percent)
+            columns["status"].extend(SOIL_MOISTURE_CLASSES.statuses(series.codes).tolist())
+
+        num_rows = write_partitioned_dataset(
+            PARQUET_DIR, f"smap-{layer_name}", columns,
+            float_columns=["moisture_percent"],
+            dictionary_columns=["city", "status"]
+        )
+        if num_rows is not None:
+            print(f"✅ Parquet créé : {PARQUET_DIR} (smap-{layer_name}, {num_rows} lignes)")
 
 if __name__ == "__main__":
     # Installer dépendances si nécessaire
@@ -400,8 +555,32 @@ if __name__ == "__main__":
         import rasterio
         import numpy
 
+    parser = argparse.ArgumentParser(description="Conversion SMAP GeoTIFF → JSON/CSV")
+    parser.add_argument(
+        "--pretty", action="store_true",
+        help="JSON indenté pour le débogage (par défaut : compact)"
+    )
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="Écrire aussi un fichier par ville et l'index (SHARDS_DIR)"
+    )
+    parser.add_argument(
+        "--zones", metavar="GEOJSON",
+        help="Polygones (communes, départements) : statistiques par zone et par date"
+    )
+    parser.add_argument(
+        "--dense", action="store_true",
+        help="Extraire aussi tous les pixels du Bénin (DENSE_DIR, stockage par blocs)"
+    )
+    parser.add_argument(
+        "--boundary", metavar="GEOJSON",
+        help="Contour du Bénin pour --dense (par défaut : rectangle englobant)"
+    )
+    args = parser.parse_args()
+
     # Traiter données
-    process_smap_data()
+    process_smap_data(pretty=args.pretty, shards=args.shards, zones=args.zones,
+                      dense=args.dense, boundary=args.boundary)
 
     print("\n" + "=" * 60)
     print("  ✅ CONVERSION TERMINÉE !")
@@ -0,0 +1,328 @@
+"""
+Extraction dense : série temporelle de chaque pixel du Bénin
+IleRise - NASA Space Apps Challenge 2025
+
+Au lieu des quelques villes codées en dur, chaque raster est découpé sur le
+contour du Bénin (GeoJSON, ou à défaut le rectangle BENIN_BBOX) et tous ses
+pixels sont conservés dans un stockage par blocs :
+
+    <dossier>/<produit>/header.json      grille, dates, taille des blocs
+    <dossier>/<produit>/pixels.npy       indices des pixels retenus (fenêtre)
+    <dossier>/<produit>/t0000_p0000.npy  bloc float32 (dates × pixels), NaN = absent
+
+Les fichiers sont lus par des processus parallèles, un lot de TIME_CHUNK
+dates à la fois : la mémoire reste bornée (TIME_CHUNK × pixels × 4 octets)
+quel que soit le nombre de fichiers. Un lieu quelconque (LocationSelector)
+est ensuite servi depuis le pixel qui le contient, en ne relisant que la
+colonne de blocs concernée (mémoire projetée).
+
+Usage:
+    python dense_grid.py [dossier]                         # lister les produits
+    python dense_grid.py dossier produit 9.3372 2.6103     # série d'un lieu
+
+    from dense_grid import extract_dense_grid, open_dense_store
+    extract_dense_grid(DENSE_DIR, "modis-lst_day", dated_files, decode)
+    series = open_dense_store(DENSE_DIR, "modis-lst_day").series(9.3372, 2.6103)
+
+Requis:
+    pip install rasterio numpy
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine, rowcol
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+
+from quality_mask import open_group
+from raster_sampling import WGS84
+from zonal_stats import ZoneMasks, load_zones
+
+DEFAULT_DIR = Path("raw-nasa-data/.cache/dense")
+HEADER_FILE = "header.json"
+PIXELS_FILE = "pixels.npy"
+
+TIME_CHUNK = 16        # Dates par bloc (et par lot lu en parallèle)
+PIXEL_CHUNK = 65536    # Pixels par bloc
+
+# Emprise du Bénin (lat_min, lat_max, lon_min, lon_max) sans contour GeoJSON
+BENIN_BBOX = (6.0, 12.5, 0.5, 4.0)
+
+
+def bbox_polygon(bbox):
+    """Rectangle (lat_min, lat_max, lon_min, lon_max) → géométrie GeoJSON"""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    return {
+        "type": "Polygon",
+        "coordinates": [[
+            [lon_min, lat_min], [lon_max, lat_min], [lon_max, lat_max],
+            [lon_min, lat_max], [lon_min, lat_min]
+        ]]
+    }
+
+
+def boundary_masks(boundary=None):
+    """Contour du pays (GeoJSON, tous polygones confondus) ou rectangle par défaut"""
+    if boundary:
+        names, geometries = load_zones(boundary)
+        return ZoneMasks(names, geometries)
+    return ZoneMasks(["Benin"], [bbox_polygon(BENIN_BBOX)])
+
+
+def chunk_path(store_dir, time_chunk, pixel_chunk):
+    return Path(store_dir) / f"t{time_chunk:04d}_p{pixel_chunk:04d}.npy"
+
+
+# Paramètres communs à tous les fichiers d'une extraction, reçus une fois par
+# processus de travail (initializer) : chaque tâche ne transporte que son chemin
+_shared = {}
+
+
+def _init_worker(grid_key, window, pixels, decode, band, quality):
+    _shared.update(grid_key=grid_key, window=window, pixels=pixels,
+                   decode=decode, band=band, quality=quality)
+
+
+def _read_pixels(path):
+    """Valeurs décodées (float32) des pixels retenus d'un fichier (processus de travail)
+
+    Retourne (valeurs, compteurs QC du fichier, erreur) : le QualityMask du
+    processus de travail est une copie, ses compteurs sont renvoyés au parent.
+    """
+    quality = _shared["quality"].fresh() if _shared["quality"] else None
+    try:
+        with open_group(path, quality) as group:
+            if ZoneMasks.grid_key(group.dataset) != _shared["grid_key"]:
+                return None, quality and quality.counts(), f"{Path(path).name}: grille différente, ignoré"
+            raw, good = group.read(_shared["window"], _shared["band"], _shared["pixels"])
+            values = np.asarray(_shared["decode"](raw, group.dataset), dtype=np.float32)
+            values[~good] = np.nan
+            return values, quality and quality.counts(), None
+    except Exception as e:
+        return None, quality and quality.counts(), f"{Path(path).name}: {e}"
+
+
+def extract_dense_grid(directory, product, files, decode, boundary=None, band=1,
+                       workers=None, time_chunk=TIME_CHUNK, pixel_chunk=PIXEL_CHUNK,
+                       attrs=None, quality=None):
+    """Extraire tous les pixels du contour pour une série de fichiers d'une même grille
+
+    files : [(date, chemin)] ; decode(raw, dataset) → float (NaN si invalide),
+    objet de module picklable, transmis une fois à chaque processus de travail.
+    quality : QualityMask, pixels rejetés par les couches QC mis à NaN.
+    Retourne le chemin de l'en-tête, ou None si aucun fichier n'est lisible.
+    """
+    files = sorted(files, key=lambda item: item[0])
+    if not files:
+        return None
+
+    # Pixels du contour, rastérisés une fois sur la grille du premier fichier
+    masks = boundary_masks(boundary)
+    with rasterio.open(files[0][1]) as dataset:
+        layout = masks.locate(dataset)
+        grid_key = masks.grid_key(dataset)
+        grid = {
+            "crs": dataset.crs.to_wkt(),
+            "transform": list(tuple(dataset.transform)[:6]),
+            "height": dataset.height,
+            "width": dataset.width
+        }
+
+    window = layout.window
+    pixels = np.unique(layout.pixels)
+    if not len(pixels):
+        print(f"❌ Aucun pixel de {product} dans le contour")
+        return None
+
+    store_dir = Path(directory) / product
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    # En-tête supprimé avant tout bloc : pendant la réécriture (ou après une
+    # interruption) le produit n'est plus listé ni ouvert sur des blocs partiels
+    header_path = store_dir / HEADER_FILE
+    header_path.unlink(missing_ok=True)
+    for stale in store_dir.glob("t*_p*.npy"):
+        stale.unlink()
+    np.save(store_dir / PIXELS_FILE, pixels)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, time_chunk))
+
+    print(f"🧮 Extraction dense {product} : {len(pixels)} pixels × {len(files)} fichiers "
+          f"(blocs {time_chunk} dates × {pixel_chunk} pixels, {workers} processus, "
+          f"≈ {time_chunk * len(pixels) * 4 / 1e6:.0f} MB par lot)")
+
+    times = []
+    pending = []
+    chunks_written = 0
+    errors = 0
+
+    def write_chunk(rows):
+        nonlocal chunks_written
+        block = np.stack(rows)
+        for pixel_index, pixel_start in enumerate(range(0, len(pixels), pixel_chunk)):
+            np.save(chunk_path(store_dir, chunks_written, pixel_index),
+                    block[:, pixel_start:pixel_start + pixel_chunk])
+        chunks_written += 1
+
+    start = time.perf_counter()
+    shared = (grid_key, window, pixels, decode, band, quality)
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=shared)
+    else:
+        executor = None
+        _init_worker(*shared)
+
+    try:
+        # Un lot de time_chunk fichiers en vol à la fois : mémoire bornée
+        for batch_start in range(0, len(files), time_chunk):
+            batch = files[batch_start:batch_start + time_chunk]
+            paths = [path for _, path in batch]
+            results = executor.map(_read_pixels, paths) if executor else map(_read_pixels, paths)
+
+            for (date, _), (values, counts, error) in zip(batch, results):
+                if counts:
+                    quality.merge(counts)
+                if error:
+                    errors += 1
+                    print(f"   ❌ Erreur avec {error}")
+                    continue
+                times.append(date)
+                pending.append(values)
+
+            # Blocs pleins uniquement ; le reste attend le lot suivant
+            while len(pending) >= time_chunk:
+                write_chunk(pending[:time_chunk])
+                del pending[:time_chunk]
+
+        if pending:
+            write_chunk(pending)
+    finally:
+        if executor:
+            executor.shutdown()
+        else:
+            _shared.clear()
+
+    elapsed = time.perf_counter() - start
+    if not times:
+        print(f"❌ Aucun fichier lisible pour {product}")
+        return None
+
+    header = {
+        "product": product,
+        "grid": grid,
+        "window": [window.col_off, window.row_off, window.width, window.height],
+        "pixels": len(pixels),
+        "times": times,
+        "time_chunk": time_chunk,
+        "pixel_chunk": pixel_chunk,
+        "dtype": "float32",
+        "attrs": attrs or {},
+        "lastUpdate": datetime.now().strftime("%Y-%m-%d")
+    }
+
+    # En-tête recréé une fois tous les blocs et pixels.npy écrits
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    total = len(pixels) * len(times)
+    print(f"⚡ {total} valeurs ({len(pixels)} pixels × {len(times)} dates) en {elapsed:.1f}s "
+          f"→ {total / max(elapsed, 1e-9):,.0f} pixels/s"
+          + (f" ({errors} fichiers en erreur)" if errors else ""))
+    print(f"💾 Grille dense : {store_dir}")
+
+    return header_path
+
+
+class DenseGridStore:
+    """Stockage dense relu en mémoire projetée ; séries par lieu à la demande"""
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / HEADER_FILE, 'r', encoding='utf-8') as f:
+            self.header = json.load(f)
+
+        self.times = self.header["times"]
+        self.pixels = np.load(self.store_dir / PIXELS_FILE, mmap_mode='r')
+        self.crs = CRS.from_wkt(self.header["grid"]["crs"])
+        self.transform = Affine(*self.header["grid"]["transform"])
+        self.window = Window(*self.header["window"])
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def locate(self, lats, lons):
+        """Colonne (indice de pixel retenu) contenant chaque lieu, -1 si hors contour"""
+        xs, ys = warp_transform(WGS84, self.crs, np.atleast_1d(lons).tolist(), np.atleast_1d(lats).tolist())
+        rows, cols = rowcol(self.transform, xs, ys)
+        rows = np.asarray(rows, dtype=np.int64) - int(self.window.row_off)
+        cols = np.asarray(cols, dtype=np.int64) - int(self.window.col_off)
+
+        inside = (rows >= 0) & (rows < self.window.height) & (cols >= 0) & (cols < self.window.width)
+        flat = np.where(inside, rows * int(self.window.width) + cols, -1)
+
+        columns = np.clip(np.searchsorted(self.pixels, flat), 0, len(self.pixels) - 1)
+        return np.where(inside & (self.pixels[columns] == flat), columns, -1)
+
+    def series_many(self, lats, lons):
+        """Matrice (dates × lieux) float32, NaN hors contour ou donnée absente"""
+        columns = self.locate(lats, lons)
+        result = np.full((len(self.times), len(columns)), np.nan, dtype=np.float32)
+
+        time_chunk = self.header["time_chunk"]
+        pixel_chunk = self.header["pixel_chunk"]
+        found = np.flatnonzero(columns >= 0)
+
+        # Seuls les blocs des colonnes demandées sont ouverts
+        for pixel_index in np.unique(columns[found] // pixel_chunk):
+            selected = found[columns[found] // pixel_chunk == pixel_index]
+            offsets = columns[selected] - pixel_index * pixel_chunk
+            for time_index in range(0, -(-len(self.times) // time_chunk)):
+                block = np.load(chunk_path(self.store_dir, time_index, int(pixel_index)), mmap_mode='r')
+                t0 = time_index * time_chunk
+                result[t0:t0 + len(block), selected] = block[:, offsets]
+
+        return result
+
+    def series(self, lat, lon):
+        """Série d'un lieu : liste de (date, valeur ou None)"""
+        values = self.series_many([lat], [lon])[:, 0]
+        return [(date, None if np.isnan(v) else float(v)) for date, v in zip(self.times, values)]
+
+
+def open_dense_store(directory, product):
+    return DenseGridStore(Path(directory) / product)
+
+
+def list_dense_stores(directory):
+    """En-têtes de tous les produits denses d'un dossier"""
+    headers = []
+    for header_path in sorted(Path(directory).glob(f"*/{HEADER_FILE}")):
+        with open(header_path, 'r', encoding='utf-8') as f:
+            headers.append(json.load(f))
+    return headers
+
+
+if __name__ == "__main__":
+    directory = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DIR
+
+    if len(sys.argv) >= 5:
+        product, lat, lon = sys.argv[2], float(sys.argv[3]), float(sys.argv[4])
+        for date, value in open_dense_store(directory, product).series(lat, lon):
+            print(f"   {date} : {'—' if value is None else f'{value:.4f}'}")
+    else:
+        print(f"📂 Grilles denses dans : {directory}")
+        for header in list_dense_stores(directory):
+            times = header["times"]
+            print(f"   {header['product']:25} : {header['pixels']} pixels × {len(times)} dates "
+                  f"({times[0]} → {times[-1]})")
@@ -5,17 +5,36 @@ IleRise - NASA Space Apps Challenge 2025
 
 Usage:
     python download_precipitation.py
+    python download_precipitation.py --shards   # + un fichier par ville
+    python download_precipitation.py --concurrency 16 --api-url http://localhost:8000/point
+    python download_precipitation.py --offline  # rejouer le cache HTTP sans réseau
+    python download_precipitation.py --start 2025-01-01 --end 2025-10-16
+        # seuls les jours absents de nasa-precipitation-benin.json sont téléchargés
+    python download_precipitation.py --parameters PRECTOTCORR,T2M,T2M_MAX,T2M_MIN,RH2M,ALLSKY_SFC_SW_DWN
+        # une requête par point pour tous les paramètres, un produit par paramètre
+    python download_precipitation.py --regional  # grille du Bénin, villes échantillonnées localement
 """
 
 import requests
+import argparse
 import json
 import csv
 from pathlib import Path
 from datetime import datetime
+from columnar_export import write_partitioned_dataset
+from city_shards import shard_paths, write_city_shards
+from precompress import precompress_outputs
+from power_client import (POWER_DAILY_POINT_URL, POWER_DAILY_REGIONAL_URL, POWER_FILL_VALUE,
+                          PowerClient, RegionalGrid, missing_ranges, split_range)
+from http_cache import ResponseCache
 
 # Configuration
 OUTPUT_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
 CSV_DIR = Path(r"C:\Projet\ilerise-nasa\public\data\csv")
+PARQUET_DIR = Path(r"C:\Projet\ilerise-nasa\exports\parquet")
+SHARDS_DIR = Path(r"C:\Projet\ilerise-nasa\public\data")
+PRECOMPRESS_MANIFEST = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\precompress.json")
+HTTP_CACHE_DIR = Path(r"C:\Projet\ilerise-nasa\raw-nasa-data\.cache\http")  # Réponses POWER
 
 # Villes du Bénin
 CITIES = {
@@ -29,50 +48,272 @@ CITIES = {
     "Kandi": {"lat": 11.1342, "lon": 2.9386}
 }
 
-def download_precipitation_for_city(city_name, lat, lon, start_date, end_date):
-    """Télécharger données précipitations pour une ville via NASA POWER API"""
-
-    # Construire URL API
-    base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-
-    params = {
-        "parameters": "PRECTOTCORR",  # Precipitation Corrected
-        "community": "AG",  # Agriculture
-        "longitude": lon,
-        "latitude": lat,
-        "start": start_date.replace("-", ""),  # 20250101
-        "end": end_date.replace("-", ""),      # 20250131
-        "format": "JSON"
+# Paramètres POWER disponibles et produit de sortie de chacun
+# (tous les paramètres demandés partagent une seule requête par point)
+POWER_PRODUCTS = {
+    "PRECTOTCORR": {"slug": "precipitation", "label": "Precipitation Corrected", "unit": "mm/day"},
+    "T2M": {"slug": "temperature-2m", "label": "Temperature at 2 Meters", "unit": "°C"},
+    "T2M_MAX": {"slug": "temperature-2m-max", "label": "Maximum Temperature at 2 Meters", "unit": "°C"},
+    "T2M_MIN": {"slug": "temperature-2m-min", "label": "Minimum Temperature at 2 Meters", "unit": "°C"},
+    "RH2M": {"slug": "humidity-2m", "label": "Relative Humidity at 2 Meters", "unit": "%"},
+    "ALLSKY_SFC_SW_DWN": {
+        "slug": "solar-radiation",
+        "label": "All Sky Surface Shortwave Downward Irradiance",
+        "unit": "MJ/m²/day"
     }
+}
+DEFAULT_PARAMETERS = ["PRECTOTCORR"]
 
-    print(f"  📡 Téléchargement pour {city_name}...", end=" ")
-
-    try:
-        response = requests.get(base_url, params=params, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-
-        # Extraire données de précipitations
-        precip_data = data['properties']['parameter']['PRECTOTCORR']
+# Zone couvrant le Bénin pour le mode régional (lat_min, lat_max, lon_min, lon_max)
+BENIN_BBOX = (6.0, 12.5, 0.5, 4.0)
 
-        print(f"✅ {len(precip_data)} jours")
+def load_known_series(json_file, value_key):
+    """Valeurs déjà téléchargées : {ville: {"AAAA-MM-JJ": valeur}} (vide sans fichier)"""
+    if not Path(json_file).exists():
+        return {}
 
-        return precip_data
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  {Path(json_file).name} illisible, téléchargement complet : {e}")
+        return {}
+
+    known = {}
+    for location in data.get('locations', []):
+        coords = CITIES.get(location['city'])
+        # Ville déplacée ou retirée : ses anciennes valeurs ne servent plus
+        if coords is None or (location['latitude'], location['longitude']) != (coords['lat'], coords['lon']):
+            continue
+        known[location['city']] = {ts['date']: ts[value_key] for ts in location['timeseries']}
+
+    return known
+
+def product_json_file(parameter):
+    """JSON de sortie d'un paramètre POWER"""
+    return OUTPUT_DIR / f"nasa-{POWER_PRODUCTS[parameter]['slug']}-benin.json"
+
+def load_known_values(parameters):
+    """Valeurs déjà présentes dans les JSON de sortie : {paramètre: {ville: {date: valeur}}}"""
+    return {
+        parameter: load_known_series(
+            product_json_file(parameter),
+            "precipitation_mm" if parameter == "PRECTOTCORR" else "value"
+        )
+        for parameter in parameters
+    }
 
-    except Exception as e:
-        print(f"❌ Erreur: {e}")
-        return None
+def known_copy(known, parameters):
+    """Copie complète des valeurs connues : {paramètre: {ville: {date: valeur}}}
+
+    Toutes les dates sont conservées, pas seulement la période demandée :
+    les sorties (JSON, partitions Parquet par année) sont réécrites en
+    entier, un rafraîchissement limité à quelques jours ne doit pas effacer
+    les jours déjà stockés.
+    """
+    return {
+        parameter: {
+            city_name: dict(known.get(parameter, {}).get(city_name, {}))
+            for city_name in CITIES
+        }
+        for parameter in parameters
+    }
 
-def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
-    """Télécharger et traiter toutes les données de précipitations"""
+def series_date_range(downloads, start_date, end_date):
+    """Période couverte : la période demandée étendue aux jours déjà connus"""
+    days = [day for series_by_city in downloads.values()
+            for series in series_by_city.values() for day in series]
+    return min(days + [start_date]), max(days + [end_date])
+
+def merge_power_series(values, series):
+    """Ajouter une série POWER ({"AAAAMMJJ": valeur}) à {"AAAA-MM-JJ": valeur}
+
+    Retourne le nombre de valeurs ajoutées.
+    """
+    added = 0
+    for date_str, value in series.items():
+        # Jour pas encore publié : laissé manquant, redemandé au prochain passage
+        if value is None or value <= POWER_FILL_VALUE:
+            continue
+        # Convertir YYYYMMDD en YYYY-MM-DD
+        values[f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"] = round(value, 2)
+        added += 1
+    return added
+
+def finish_downloads(downloads, parameters, added):
+    """Trier les séries par date et afficher le bilan par ville"""
+    for parameter in parameters:
+        for city_name in CITIES:
+            downloads[parameter][city_name] = dict(sorted(downloads[parameter][city_name].items()))
+
+    for city_name in CITIES:
+        num_days = min(len(downloads[parameter][city_name]) for parameter in parameters)
+        print(f"  📡 {city_name:15} ✅ {num_days} jours (+{added[city_name]} valeurs)")
+
+    return downloads
+
+def download_all_cities(start_date, end_date, concurrency=8, api_url=POWER_DAILY_POINT_URL,
+                        offline=False, known=None, parameters=DEFAULT_PARAMETERS):
+    """Télécharger les jours manquants de toutes les villes en parallèle
+
+    Tous les paramètres sont demandés dans une seule requête par point et
+    par période. known : valeurs déjà présentes ({paramètre: {ville: {date:
+    valeur}}}) ; un jour n'est redemandé que s'il manque pour au moins un
+    paramètre. Les sous-périodes absentes sont découpées en requêtes d'au
+    plus un an, exécutées en parallèle puis fusionnées par date. Les
+    réponses passent par le cache HTTP (HTTP_CACHE_DIR) ; offline=True
+    n'utilise que le cache.
+
+    Retourne {paramètre: {ville: {"AAAA-MM-JJ": valeur}}} trié par date :
+    les valeurs connues (toutes dates) complétées des jours téléchargés.
+    """
+    known = known or {}
+
+    jobs = {}
+    reused = 0
+    for city_name, coords in CITIES.items():
+        city_known = [set(known.get(parameter, {}).get(city_name, {})) for parameter in parameters]
+        complete_days = set.intersection(*city_known) if city_known else set()
+        reused += sum(1 for day in complete_days if start_date <= day <= end_date)
+
+        for gap_start, gap_end in missing_ranges(complete_days, start_date, end_date):
+            for chunk_start, chunk_end in split_range(gap_start, gap_end):
+                jobs[(city_name, chunk_start, chunk_end)] = (coords['lat'], coords['lon'], chunk_start, chunk_end)
+
+    print(f"🧩 {len(jobs)} requêtes ({len(parameters)} paramètres chacune) "
+          f"pour les jours manquants ({reused} jours déjà présents par ville)")
+
+    responses = {}
+    if jobs:
+        cache = ResponseCache(HTTP_CACHE_DIR, offline=offline)
+        with PowerClient(api_url, concurrency=concurrency, cache=cache) as client:
+            responses = client.fetch_many(jobs, ",".join(parameters))
+        print(cache.summary())
+
+    downloads = known_copy(known, parameters)
+
+    added = dict.fromkeys(CITIES, 0)
+    for (city_name, chunk_start, chunk_end), data in responses.items():
+        if data is None:
+            continue
+        try:
+            series_by_parameter = data['properties']['parameter']
+        except (KeyError, TypeError) as e:
+            print(f"  📡 {city_name:15} ❌ Réponse inattendue ({chunk_start} → {chunk_end}) : {e}")
+            continue
+
+        # Répartir la réponse entre les produits
+        for parameter in parameters:
+            added[city_name] += merge_power_series(
+                downloads[parameter][city_name], series_by_parameter.get(parameter, {})
+            )
+
+    return finish_downloads(downloads, parameters, added)
+
+def download_region(start_date, end_date, concurrency=8, regional_url=POWER_DAILY_REGIONAL_URL,
+                    offline=False, known=None, parameters=DEFAULT_PARAMETERS, bbox=BENIN_BBOX):
+    """Télécharger la grille régionale puis l'échantillonner pour chaque ville
+
+    Une requête par paramètre et par tranche d'au plus un an, quel que soit
+    le nombre de villes : la grille (mise en cache disque comme toute
+    réponse) est échantillonnée localement à la cellule la plus proche. Les
+    jours demandés sont ceux qui manquent à au moins une ville.
+
+    Retourne la même structure que download_all_cities.
+    """
+    known = known or {}
+
+    complete_days = set.intersection(*[
+        set(known.get(parameter, {}).get(city_name, {}))
+        for parameter in parameters for city_name in CITIES
+    ])
+
+    jobs = {}
+    for gap_start, gap_end in missing_ranges(complete_days, start_date, end_date):
+        for chunk_start, chunk_end in split_range(gap_start, gap_end):
+            for parameter in parameters:
+                jobs[(parameter, chunk_start, chunk_end)] = (bbox, chunk_start, chunk_end, parameter)
+
+    print(f"🧩 {len(jobs)} requêtes régionales pour {len(CITIES)} villes "
+          f"(zone {bbox[0]}..{bbox[1]}°N, {bbox[2]}..{bbox[3]}°E)")
+
+    responses = {}
+    if jobs:
+        cache = ResponseCache(HTTP_CACHE_DIR, offline=offline)
+        with PowerClient(concurrency=concurrency, cache=cache, regional_url=regional_url) as client:
+            responses = client.fetch_regions(jobs)
+        print(cache.summary())
+
+    downloads = known_copy(known, parameters)
+
+    city_names = list(CITIES)
+    lats = [CITIES[name]['lat'] for name in city_names]
+    lons = [CITIES[name]['lon'] for name in city_names]
+
+    added = dict.fromkeys(CITIES, 0)
+    for (parameter, chunk_start, chunk_end), data in responses.items():
+        if data is None:
+            continue
+        try:
+            grid = RegionalGrid(data, parameter)
+        except (KeyError, TypeError, IndexError) as e:
+            print(f"  🗺️  {parameter} ❌ Réponse inattendue ({chunk_start} → {chunk_end}) : {e}")
+            continue
+
+        for city_name, series in zip(city_names, grid.sample(lats, lons)):
+            added[city_name] += merge_power_series(downloads[parameter][city_name], series)
+
+    return finish_downloads(downloads, parameters, added)
+
+def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31", shards=False,
+                               concurrency=8, api_url=POWER_DAILY_POINT_URL, offline=False,
+                               parameters=DEFAULT_PARAMETERS, regional=False,
+                               regional_url=POWER_DAILY_REGIONAL_URL):
+    """Télécharger et traiter les paramètres POWER (précipitations par défaut)
+
+    parameters : liste de paramètres de POWER_PRODUCTS, demandés ensemble
+    (une requête par point) puis écrits chacun dans son produit.
+    regional : télécharger la grille BENIN_BBOX et l'échantillonner
+    localement (nombre de requêtes indépendant du nombre de villes).
+    """
 
     print("\n" + "=" * 60)
     print("  TÉLÉCHARGEMENT PRÉCIPITATIONS NASA POWER")
     print("  IleRise - NASA Space Apps Challenge 2025")
     print("=" * 60)
     print(f"\n📅 Période : {start_date} → {end_date}")
-    print(f"🌍 Région : Bénin ({len(CITIES)} villes)\n")
+    print(f"🌍 Région : Bénin ({len(CITIES)} villes)")
+    print(f"🛰️  Paramètres : {', '.join(parameters)}\n")
+
+    unknown = [p for p in parameters if p not in POWER_PRODUCTS]
+    if unknown:
+        print(f"❌ Paramètres inconnus : {', '.join(unknown)} (voir POWER_PRODUCTS)")
+        return None
+
+    # Ne télécharger que les jours absents des JSON existants (requêtes concurrentes)
+    known = load_known_values(parameters)
+    if regional:
+        downloads = download_region(start_date, end_date, concurrency, regional_url, offline, known, parameters)
+    else:
+        downloads = download_all_cities(start_date, end_date, concurrency, api_url, offline, known, parameters)
+
+    # Les sorties couvrent toute la série fusionnée, pas seulement la période demandée
+    first_date, last_date = series_date_range(downloads, start_date, end_date)
+
+    outputs = []
+    for parameter in parameters:
+        if parameter == "PRECTOTCORR":
+            outputs += create_precipitation_outputs(downloads[parameter], first_date, last_date, shards)
+        else:
+            outputs += create_parameter_outputs(parameter, downloads[parameter], first_date, last_date, shards)
+
+    # Versions précompressées (.gz/.br) pour le navigateur
+    precompress_outputs(outputs, PRECOMPRESS_MANIFEST)
+
+    return outputs[0] if outputs else None
+
+def create_precipitation_outputs(downloads, start_date, end_date, shards=False):
+    """JSON, CSV, Parquet (et fichiers par ville) des précipitations"""
 
     # Structure pour stocker les données
     all_data = {
@@ -87,15 +328,8 @@ def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
         "locations": []
     }
 
-    # Télécharger pour chaque ville
     for city_name, coords in CITIES.items():
-        precip_data = download_precipitation_for_city(
-            city_name,
-            coords['lat'],
-            coords['lon'],
-            start_date,
-            end_date
-        )
+        precip_data = downloads[city_name]
 
         if precip_data:
             # Convertir dictionnaire en liste de tuples (date, valeur)
@@ -104,13 +338,7 @@ def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
             rainy_days = 0
             max_precip = 0
 
-            for date_str, precip_mm in precip_data.items():
-                # Convertir YYYYMMDD en YYYY-MM-DD
-                year = date_str[:4]
-                month = date_str[4:6]
-                day = date_str[6:8]
-                formatted_date = f"{year}-{month}-{day}"
-
+            for formatted_date, precip_mm in precip_data.items():
                 daily_data.append({
                     "date": formatted_date,
                     "precipitation_mm": round(precip_mm, 2)
@@ -141,7 +369,7 @@ def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
             })
 
     # Sauvegarder JSON
-    json_file = OUTPUT_DIR / "nasa-precipitation-benin.json"
+    json_file = product_json_file("PRECTOTCORR")
     json_file.parent.mkdir(parents=True, exist_ok=True)
 
     with open(json_file, 'w', encoding='utf-8') as f:
@@ -151,7 +379,19 @@ def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
     print(f"📊 {len(all_data['locations'])} villes avec données")
 
     # Créer CSV
-    create_precipitation_csv(all_data)
+    csv_file = create_precipitation_csv(all_data)
+
+    # Créer Parquet (colonnaire, partitionné par année)
+    create_precipitation_parquet(all_data)
+
+    # Fichiers par ville (chargement à la demande)
+    outputs = [json_file, csv_file]
+    if shards:
+        entries = write_city_shards(SHARDS_DIR, "precipitation", {
+            loc['city']: (loc, [ts['date'] for ts in loc['timeseries']])
+            for loc in all_data['locations']
+        }, meta={"source": all_data['source'], "description": all_data['product']})
+        outputs += shard_paths(SHARDS_DIR, entries)
 
     # Afficher résumé
     print("\n📊 Résumé précipitations (période complète) :")
@@ -161,7 +401,7 @@ def process_precipitation_data(start_date="2025-01-01", end_date="2025-01-31"):
         rainy = loc['precipitation']['rainy_days']
         print(f"   {city:20} : {total:6.1f} mm ({rainy} jours pluvieux)")
 
-    return json_file
+    return outputs
 
 def create_precipitation_csv(data):
     """Créer fichier CSV des précipitations"""
@@ -200,6 +440,121 @@ def create_precipitation_csv(data):
     num_rows = sum(1 for _ in open(csv_file)) - 1
     print(f"✅ CSV créé : {csv_file.name} ({num_rows} lignes)")
 
+    return csv_file
+
+def create_precipitation_parquet(data):
+    """Créer l'export Parquet des précipitations (partitionné par année)"""
+
+    columns = {"city": [], "latitude": [], "longitude": [],
+               "date": [], "precipitation_mm": []}
+
+    for location in data['locations']:
+        for ts in location['timeseries']:
+            columns["city"].append(location['city'])
+            columns["latitude"].append(location['latitude'])
+            columns["longitude"].append(location['longitude'])
+            columns["date"].append(ts['date'])
+            columns["precipitation_mm"].append(ts['precipitation_mm'])
+
+    num_rows = write_partitioned_dataset(
+        PARQUET_DIR, "precipitation", columns,
+        float_columns=["precipitation_mm"],
+        dictionary_columns=["city"]
+    )
+    if num_rows is not None:
+        print(f"✅ Parquet créé : {PARQUET_DIR} (precipitation, {num_rows} lignes)")
+
+def create_parameter_outputs(parameter, downloads, start_date, end_date, shards=False):
+    """JSON, CSV, Parquet (et fichiers par ville) d'un autre paramètre POWER"""
+
+    product = POWER_PRODUCTS[parameter]
+
+    data = {
+        "source": "NASA POWER API",
+        "product": f"{product['label']} ({parameter})",
+        "parameter": parameter,
+        "unit": product['unit'],
+        "region": "Benin",
+        "dateRange": {
+            "start": start_date,
+            "end": end_date
+        },
+        "lastUpdate": datetime.now().strftime("%Y-%m-%d"),
+        "locations": []
+    }
+
+    for city_name, coords in CITIES.items():
+        values = downloads[city_name]
+        if not values:
+            continue
+
+        series = list(values.values())
+        data['locations'].append({
+            "city": city_name,
+            "country": "Benin",
+            "latitude": coords['lat'],
+            "longitude": coords['lon'],
+            "statistics": {
+                "average": round(sum(series) / len(series), 2),
+                "min": round(min(series), 2),
+                "max": round(max(series), 2)
+            },
+            "timeseries": [{"date": day, "value": value} for day, value in values.items()]
+        })
+
+    json_file = product_json_file(parameter)
+    json_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ JSON créé : {json_file}")
+
+    csv_file = CSV_DIR / f"nasa-{product['slug']}-benin.csv"
+    csv_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['City', 'Country', 'Latitude', 'Longitude', 'Date', parameter, 'Unit'])
+        for location in data['locations']:
+            for ts in location['timeseries']:
+                writer.writerow([
+                    location['city'], location['country'],
+                    location['latitude'], location['longitude'],
+                    ts['date'], ts['value'], product['unit']
+                ])
+
+    print(f"✅ CSV créé : {csv_file.name}")
+
+    columns = {"city": [], "latitude": [], "longitude": [], "date": [], "value": []}
+    for location in data['locations']:
+        for ts in location['timeseries']:
+            columns["city"].append(location['city'])
+            columns["latitude"].append(location['latitude'])
+            columns["longitude"].append(location['longitude'])
+            columns["date"].append(ts['date'])
+            columns["value"].append(ts['value'])
+
+    num_rows = write_partitioned_dataset(
+        PARQUET_DIR, product['slug'], columns,
+        float_columns=["value"],
+        dictionary_columns=["city"]
+    )
+    if num_rows is not None:
+        print(f"✅ Parquet créé : {PARQUET_DIR} ({product['slug']}, {num_rows} lignes)")
+
+    outputs = [json_file, csv_file]
+    if shards:
+        entries = write_city_shards(SHARDS_DIR, product['slug'], {
+            loc['city']: (loc, [ts['date'] for ts in loc['timeseries']])
+            for loc in data['locations']
+        }, meta={"source": data['source'], "description": data['product']})
+        outputs += shard_paths(SHARDS_DIR, entries)
+
+    print(f"📊 {parameter} : {len(data['locations'])} villes avec données ({product['unit']})")
+
+    return outputs
+
 if __name__ == "__main__":
     # Installer requests si nécessaire
     try:
@@ -210,10 +565,50 @@ if __name__ == "__main__":
         subprocess.check_call(['pip', 'install', 'requests'])
         import requests
 
+    parser = argparse.ArgumentParser(description="Téléchargement précipitations NASA POWER")
+    parser.add_argument("--start", default="2025-01-01", help="Début de période (AAAA-MM-JJ)")
+    parser.add_argument("--end", default="2025-01-31", help="Fin de période (AAAA-MM-JJ)")
+    parser.add_argument(
+        "--parameters", default=",".join(DEFAULT_PARAMETERS),
+        help=f"Paramètres POWER séparés par des virgules (parmi {', '.join(POWER_PRODUCTS)})"
+    )
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="Écrire aussi un fichier par ville et l'index (SHARDS_DIR)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8,
+        help="Requêtes simultanées vers l'API (défaut : 8)"
+    )
+    parser.add_argument(
+        "--api-url", default=POWER_DAILY_POINT_URL,
+        help="URL de l'API POWER daily/point (ex. serveur local de test)"
+    )
+    parser.add_argument(
+        "--regional", action="store_true",
+        help="Télécharger la grille couvrant le Bénin et l'échantillonner localement"
+    )
+    parser.add_argument(
+        "--regional-url", default=POWER_DAILY_REGIONAL_URL,
+        help="URL de l'API POWER daily/regional (ex. serveur local de test)"
+    )
+    parser.add_argument(
+        "--offline", action="store_true",
+        help="Sans réseau : rejouer les réponses du cache HTTP (HTTP_CACHE_DIR)"
+    )
+    args = parser.parse_args()
+
     # Télécharger données
     process_precipitation_data(
-        start_date="2025-01-01",
-        end_date="2025-01-31"
+        start_date=args.start,
+        end_date=args.end,
+        shards=args.shards,
+        concurrency=args.concurrency,
+        api_url=args.api_url,
+        offline=args.offline,
+        parameters=[p.strip() for p in args.parameters.split(",") if p.strip()],
+        regional=args.regional,
+        regional_url=args.regional_url
     )
 
     print("\n" + "=" * 60)
@@ -0,0 +1,152 @@
+"""
+Cache disque des réponses HTTP JSON (API NASA POWER)
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque réponse est stockée dans un fichier JSON dont le nom est le hash des
+paramètres normalisés de la requête (URL, paramètres triés, coordonnées
+arrondies) :
+
+    <dossier>/<sha256>.json   {url, params, fetched_at, etag, last_modified, body}
+
+Une entrée plus jeune que son TTL est servie sans réseau. Une entrée expirée
+est revalidée avec If-None-Match / If-Modified-Since : un 304 prolonge
+l'entrée sans retélécharger le corps. En mode hors ligne, seules les
+entrées en cache sont utilisées (même expirées) ; une entrée absente lève
+CacheMiss. Ce mode permet de régénérer les sorties sans réseau (CI, machine
+isolée).
+
+Usage:
+    from http_cache import ResponseCache
+
+    cache = ResponseCache(CACHE_DIR, offline=False)
+    entry = cache.lookup(url, params)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class CacheMiss(LookupError):
+    """Réponse absente du cache en mode hors ligne"""
+
+
+def normalize_params(params):
+    """Paramètres triés, coordonnées arrondies à 4 décimales, tout en texte"""
+    normalized = {}
+    for key, value in sorted(params.items()):
+        if isinstance(value, float):
+            value = f"{value:.4f}"
+        normalized[key] = str(value)
+    return normalized
+
+
+def request_key(url, params):
+    """Clé de cache stable d'une requête GET"""
+    payload = json.dumps([url, normalize_params(params)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Réponses JSON persistées sur disque avec TTL et revalidation"""
+
+    def __init__(self, directory, offline=False):
+        self.directory = Path(directory)
+        self.offline = offline
+        self.fresh = 0
+        self.revalidated = 0
+        self.downloaded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+
+    def _path(self, url, params):
+        return self.directory / f"{request_key(url, params)}.json"
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, url, params):
+        """Entrée en cache (dict) ou None"""
+        path = self._path(url, params)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry, ttl):
+        """Entrée encore valide ? (ttl en secondes, None = sans expiration)"""
+        return ttl is None or time.time() - entry["fetched_at"] < ttl
+
+    def validators(self, entry):
+        """En-têtes de requête conditionnelle pour une entrée expirée"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, params, body, etag=None, last_modified=None):
+        """Enregistrer une réponse (écriture atomique)"""
+        path = self._path(url, params)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        entry = {
+            "url": url,
+            "params": normalize_params(params),
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body
+        }
+
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        return entry
+
+    def get(self, url, params, fetch, ttl=None):
+        """Réponse JSON d'une requête, servie par le cache quand c'est possible
+
+        fetch(headers) effectue la requête et retourne (statut, corps JSON ou
+        None pour un 304, etag, last_modified).
+        """
+        entry = self.lookup(url, params)
+
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"absent du cache hors ligne : {url} {normalize_params(params)}")
+            self._count("replayed")
+            return entry["body"]
+
+        if entry is not None and self.is_fresh(entry, ttl):
+            self._count("fresh")
+            return entry["body"]
+
+        status, body, etag, last_modified = fetch(self.validators(entry))
+
+        if status == 304 and entry is not None:
+            self._count("revalidated")
+            self.store(url, params, entry["body"],
+                       etag or entry.get("etag"), last_modified or entry.get("last_modified"))
+            return entry["body"]
+
+        self._count("downloaded")
+        self.store(url, params, body, etag, last_modified)
+        return body
+
+    def summary(self):
+        if self.offline:
+            return f"📦 Cache HTTP (hors ligne) : {self.replayed} réponses rejouées"
+        return (f"📦 Cache HTTP : {self.fresh} à jour, {self.revalidated} revalidées (304), "
+                f"{self.downloaded} téléchargées")
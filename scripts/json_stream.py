@@ -0,0 +1,94 @@
+"""
+Écriture JSON en flux pour les gros fichiers de sortie
+IleRise - NASA Space Apps Challenge 2025
+
+Les listes peuvent être des générateurs ou tout autre itérable : chaque
+élément est encodé et écrit dès qu'il est produit, sans construire l'arbre
+complet ni la chaîne finale en mémoire.
+
+Mode compact (par défaut) : pas d'indentation, séparateurs minimaux et
+flottants arrondis à une précision fixe. Le mode pretty reproduit
+json.dump(indent=2) et sert au débogage.
+
+Usage:
+    from json_stream import write_json_stream
+
+    with open(json_file, 'w', encoding='utf-8') as f:
+        write_json_stream(f, output_data, pretty=False, float_digits=4)
+"""
+
+import json
+import math
+
+
+class JsonStreamWriter:
+    """Encodeur JSON incrémental (dict, itérables, scalaires, scalaires NumPy)"""
+
+    def __init__(self, f, pretty=False, float_digits=None, indent=2):
+        self.f = f
+        self.pretty = pretty
+        self.float_digits = float_digits
+        self.indent = " " * indent if pretty else ""
+        self.key_separator = ": " if pretty else ":"
+
+    def write(self, obj):
+        for chunk in self._encode(obj, 0):
+            self.f.write(chunk)
+
+    def _newline(self, level):
+        return "\n" + self.indent * level if self.pretty else ""
+
+    def _encode_float(self, value):
+        if self.float_digits is not None and math.isfinite(value):
+            value = round(value, self.float_digits)
+        return json.dumps(float(value))
+
+    def _encode(self, obj, level):
+        if isinstance(obj, str) or obj is None or isinstance(obj, (bool, int)):
+            yield json.dumps(obj, ensure_ascii=False)
+        elif isinstance(obj, float):
+            yield self._encode_float(obj)
+        elif isinstance(obj, dict):
+            yield from self._encode_dict(obj, level)
+        elif hasattr(obj, 'item') and not hasattr(obj, '__len__'):
+            # Scalaire NumPy (np.float32, np.int64...) → type Python
+            yield from self._encode(obj.item(), level)
+        elif hasattr(obj, '__iter__'):
+            yield from self._encode_list(obj, level)
+        else:
+            raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+    def _encode_dict(self, obj, level):
+        if not obj:
+            yield "{}"
+            return
+
+        yield "{"
+        first = True
+        for key, value in obj.items():
+            if not first:
+                yield ","
+            first = False
+            yield self._newline(level + 1)
+            yield json.dumps(str(key), ensure_ascii=False) + self.key_separator
+            yield from self._encode(value, level + 1)
+        yield self._newline(level)
+        yield "}"
+
+    def _encode_list(self, items, level):
+        yield "["
+        first = True
+        for item in items:
+            if not first:
+                yield ","
+            first = False
+            yield self._newline(level + 1)
+            yield from self._encode(item, level + 1)
+        if not first:
+            yield self._newline(level)
+        yield "]"
+
+
+def write_json_stream(f, obj, pretty=False, float_digits=None):
+    """Écrire obj dans le fichier f, élément par élément"""
+    JsonStreamWriter(f, pretty=pretty, float_digits=None if pretty else float_digits).write(obj)
@@ -0,0 +1,265 @@
+"""
+Extraction multi-couches : toutes les bandes d'une date en une seule passe
+IleRise - NASA Space Apps Challenge 2025
+
+Les fichiers AppEEARS d'un même produit et d'un même horodatage (doy) sont
+regroupés :
+
+    MOD11A2.061_LST_Day_1km_doy2025001000000_aid0001.tif
+    MOD11A2.061_LST_Night_1km_doy2025001000000_aid0001.tif   → groupe 2025-01-01
+    MOD11A2.061_Emis_31_doy2025001000000_aid0001.tif
+
+Le plan d'échantillonnage est calculé une fois par grille et chaque couche
+demandée ne coûte qu'une lecture des blocs touchés par les villes. Les
+valeurs sont décodées par le registre des produits (product_registry :
+échelle, offset, fill, plage valide ; à défaut l'échelle/offset du
+GeoTIFF), et les couches QC du groupe (quality_mask.QC_LAYERS) masquent la bande
+correspondante sans relecture. La sortie est un seul enregistrement par
+produit, avec une variable par couche.
+
+Usage:
+    python multi_layer.py raw-nasa-data/temperature --layers LST_Day_1km LST_Night_1km Emis_31 Emis_32
+    python multi_layer.py raw-nasa-data/soil-moisture --layers sm_rootzone baseflow_flux
+
+Requis:
+    pip install rasterio numpy
+"""
+
+import argparse
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import rasterio
+
+from json_stream import write_json_stream
+from precompress import precompress_outputs
+from product_registry import codec_for_dataset
+from quality_mask import qc_rules
+from raster_sampling import SamplingPlan
+
+OUTPUT_DIR = Path("public/data")
+PRECOMPRESS_MANIFEST = Path("raw-nasa-data/.cache/precompress.json")
+
+# <produit>_<couche>_doy<AAAAJJJ[HHMMSS]>_aid0001.tif
+LAYER_FILE_PATTERN = re.compile(r"^(?P<product>[A-Z0-9]+\.\d{3})_+(?P<layer>.+?)_doy(?P<doy>\d{7,13})_aid\d+\.tif$")
+
+
+def parse_layer_filename(filename):
+    """(produit, couche, horodatage) d'un fichier AppEEARS, ou None"""
+    match = LAYER_FILE_PATTERN.match(filename)
+    if not match:
+        return None
+    return match["product"], match["layer"], format_doy(match["doy"])
+
+
+def format_doy(doy):
+    """"2025001013000" → "2025-01-01T01:30:00" ("2025-01-01" à minuit)"""
+    date = datetime.strptime(doy[:7], "%Y%j")
+    clock = doy[7:].ljust(6, "0")
+    if clock == "000000":
+        return date.strftime("%Y-%m-%d")
+    return f"{date.strftime('%Y-%m-%d')}T{clock[:2]}:{clock[2:4]}:{clock[4:6]}"
+
+
+def scan_product_groups(directory):
+    """Fichiers d'un dossier groupés : {produit: {horodatage: {couche: chemin}}}"""
+    products = {}
+    for path in sorted(Path(directory).glob("*.tif")):
+        parsed = parse_layer_filename(path.name)
+        if parsed is None:
+            continue
+        product, layer, timestamp = parsed
+        products.setdefault(product, {}).setdefault(timestamp, {})[layer] = path
+
+    return {product: dict(sorted(groups.items())) for product, groups in products.items()}
+
+
+def match_layer(available, name):
+    """Nom complet d'une couche désignée par son nom court, ou None"""
+    matches = [layer for layer in available if layer == name or layer.endswith(f"_{name}")]
+    return matches[0] if matches else None
+
+
+def resolve_layers(available, requested):
+    """Noms courts demandés → noms complets ("sm_rootzone" → "Geophysical_Data_sm_rootzone")"""
+    resolved = {}
+    for name in requested:
+        layer = match_layer(available, name)
+        if layer is None:
+            print(f"⚠️  Couche introuvable : {name}")
+            continue
+        resolved[name] = layer
+    return resolved
+
+
+class MultiLayerExtractor:
+    """Échantillonnage de plusieurs couches par groupe de fichiers d'une même date"""
+
+    def __init__(self, cities, layers, product):
+        # layers : {nom court: nom complet de la couche}
+        self.plan = SamplingPlan(cities)
+        self.layers = dict(layers)
+        self.product = product
+        self.units = {}
+        self.groups_read = 0
+        self.qc_masked = 0
+
+    def extract_group(self, files):
+        """{nom court: vecteur float (NaN = absent)} pour un groupe {couche: chemin}"""
+        datasets = {}
+        try:
+            for layer, path in files.items():
+                datasets[layer] = rasterio.open(path)
+
+            qc_samples = {}
+            variables = {}
+            for name, layer in self.layers.items():
+                if layer not in datasets:
+                    variables[name] = np.full(len(self.plan.names), np.nan)
+                    continue
+
+                dataset = datasets[layer]
+                codec = codec_for_dataset(self.product, layer, dataset)
+                self.units.setdefault(name, codec.unit)
+
+                values, inside = self.plan.sample(dataset)
+                decoded = np.where(inside, codec.decode(values, dataset.nodata), np.nan)
+
+                # Couches QC du même groupe, échantillonnées une fois pour toutes les bandes
+                # (règles et fichiers QC retrouvés par suffixe : "250m_16_days_VI_Quality")
+                for qc_name, decode_qc in qc_rules(layer).items():
+                    qc_layer = match_layer(datasets, qc_name)
+                    if qc_layer is None:
+                        continue
+                    if qc_layer not in qc_samples:
+                        qc_samples[qc_layer] = self.plan.sample(datasets[qc_layer])[0]
+                    bad = inside & ~decode_qc(qc_samples[qc_layer]) & ~np.isnan(decoded)
+                    self.qc_masked += int(bad.sum())
+                    decoded[bad] = np.nan
+
+                variables[name] = decoded
+        finally:
+            for dataset in datasets.values():
+                dataset.close()
+
+        self.groups_read += 1
+        return variables
+
+    def extract(self, groups):
+        """Horodatages et matrices {nom court: (horodatages × villes)}"""
+        timestamps = []
+        rows = {name: [] for name in self.layers}
+
+        for timestamp, files in groups.items():
+            if not any(layer in files for layer in self.layers.values()):
+                continue
+            try:
+                variables = self.extract_group(files)
+            except Exception as e:
+                print(f"   ❌ Erreur groupe {timestamp}: {e}")
+                continue
+
+            timestamps.append(timestamp)
+            for name, values in variables.items():
+                rows[name].append(values)
+
+        matrices = {
+            name: np.array(values, dtype=np.float64).reshape(len(timestamps), len(self.plan.names))
+            for name, values in rows.items()
+        }
+        return timestamps, matrices
+
+    def summary(self):
+        return (f"🧭 {self.groups_read} groupes × {len(self.layers)} couches | "
+                f"Reprojections : {self.plan.reprojections} | Blocs lus : {self.plan.blocks_read} | "
+                f"Rejetés QC : {self.qc_masked}")
+
+
+def location_entries(cities, timestamps, matrices, digits=4):
+    """Entrées JSON par ville ; séries multi-variables générées à la demande"""
+    def series(i):
+        for t, timestamp in enumerate(timestamps):
+            entry = {"date": timestamp}
+            for name, matrix in matrices.items():
+                value = matrix[t, i]
+                entry[name] = None if np.isnan(value) else round(float(value), digits)
+            yield entry
+
+    for i, (city, coords) in enumerate(cities.items()):
+        yield {
+            "city": city,
+            "country": "Benin",
+            "latitude": coords["lat"],
+            "longitude": coords["lon"],
+            "timeseries": series(i)
+        }
+
+
+def extract_product(directory, cities, layers, product=None, output_file=None, pretty=False):
+    """Extraire les couches demandées d'un produit et écrire un seul JSON
+
+    Retourne le chemin du JSON, ou None si aucune couche n'est trouvée.
+    """
+    products = scan_product_groups(directory)
+    if not products:
+        print(f"❌ Aucun fichier AppEEARS dans {directory}")
+        return None
+
+    product = product or next(iter(products))
+    if product not in products:
+        print(f"❌ Produit {product} absent de {directory} ({', '.join(products)})")
+        return None
+
+    groups = products[product]
+    available = sorted({layer for files in groups.values() for layer in files})
+    resolved = resolve_layers(available, layers)
+    if not resolved:
+        return None
+
+    print(f"📦 {product} : {len(groups)} dates, couches {', '.join(resolved.values())}")
+
+    extractor = MultiLayerExtractor(cities, resolved, product)
+    timestamps, matrices = extractor.extract(groups)
+    print(extractor.summary())
+
+    output_file = Path(output_file or OUTPUT_DIR / f"nasa-{product.split('.')[0].lower()}-layers-benin.json")
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        write_json_stream(f, {
+            "source": f"NASA {product}",
+            "product": product,
+            "region": "Benin",
+            "lastUpdate": datetime.now().strftime("%Y-%m-%d"),
+            "variables": {name: layer for name, layer in resolved.items()},
+            "units": {name: extractor.units.get(name) for name in resolved},
+            "dateRange": {
+                "start": timestamps[0] if timestamps else None,
+                "end": timestamps[-1] if timestamps else None
+            },
+            "locations": location_entries(cities, timestamps, matrices)
+        }, pretty=pretty, float_digits=4)
+
+    print(f"✅ JSON créé : {output_file} ({len(timestamps)} dates × {len(resolved)} variables)")
+    return output_file
+
+
+if __name__ == "__main__":
+    from convert_nasa_geotiff import CITIES
+
+    parser = argparse.ArgumentParser(description="Extraction multi-couches AppEEARS → JSON")
+    parser.add_argument("directory", help="Dossier des GeoTIFF (ex. raw-nasa-data/temperature)")
+    parser.add_argument(
+        "--layers", nargs="+", required=True,
+        help="Couches à extraire (ex. LST_Day_1km LST_Night_1km Emis_31 sm_rootzone)"
+    )
+    parser.add_argument("--product", help="Produit (ex. MOD11A2.061) si le dossier en contient plusieurs")
+    parser.add_argument("--output", help="Fichier JSON (défaut : public/data/nasa-<produit>-layers-benin.json)")
+    parser.add_argument("--pretty", action="store_true", help="JSON indenté (débogage)")
+    args = parser.parse_args()
+
+    json_file = extract_product(args.directory, CITIES, args.layers, args.product, args.output, args.pretty)
+    if json_file:
+        precompress_outputs([json_file], PRECOMPRESS_MANIFEST)
@@ -0,0 +1,276 @@
+"""
+Client HTTP partagé pour l'API NASA POWER (téléchargements concurrents)
+IleRise - NASA Space Apps Challenge 2025
+
+Une seule session requests est partagée par tous les téléchargements :
+connexions keep-alive réutilisées (pool dimensionné sur la concurrence) et
+nouvelles tentatives avec attente exponentielle sur 429/5xx (l'en-tête
+Retry-After est respecté). Les points sont téléchargés en parallèle avec
+une concurrence bornée : la durée totale est proche de celle de la requête
+la plus lente, pas de la somme.
+
+Le mode régional (fetch_regions) télécharge une grille couvrant une zone
+(un paramètre par requête, contrainte de l'API) ; RegionalGrid échantillonne
+ensuite localement autant de lieux que voulu, sans requête supplémentaire.
+
+L'URL de l'API est un paramètre : un serveur HTTP local peut remplacer POWER
+pour les essais. Avec un ResponseCache (http_cache.py), les réponses sont
+conservées sur disque : longtemps pour les périodes anciennes, quelques
+heures pour les périodes récentes encore susceptibles d'être révisées.
+
+Usage:
+    from http_cache import ResponseCache
+    from power_client import PowerClient
+
+    with PowerClient(concurrency=8, cache=ResponseCache(CACHE_DIR)) as client:
+        results = client.fetch_points(
+            {"Cotonou": (6.3667, 2.3833)}, "2025-01-01", "2025-01-31"
+        )
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import CacheMiss
+
+POWER_DAILY_POINT_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+POWER_DAILY_REGIONAL_URL = "https://power.larc.nasa.gov/api/temporal/daily/regional"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POWER_FILL_VALUE = -999.0   # Jour pas encore disponible / valeur manquante
+CHUNK_DAYS = 366            # Taille maximale d'une requête (jours)
+
+# Durée de validité des réponses en cache (secondes)
+RECENT_TTL = 6 * 3600                # période touchant les 90 derniers jours
+HISTORICAL_TTL = 365 * 24 * 3600     # période ancienne : valeurs définitives
+REVISION_WINDOW_DAYS = 90
+
+
+def response_ttl(end_date, today=None):
+    """TTL d'une réponse selon la fin de la période demandée ("AAAA-MM-JJ")"""
+    today = today or date.today()
+    if date.fromisoformat(end_date) < today - timedelta(days=REVISION_WINDOW_DAYS):
+        return HISTORICAL_TTL
+    return RECENT_TTL
+
+
+def create_session(concurrency=8, retries=5, backoff=1.0):
+    """Session keep-alive avec nouvelles tentatives (backoff × 2^n secondes)"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def missing_ranges(known_dates, start_date, end_date):
+    """Sous-périodes [début, fin] de start_date..end_date absentes de known_dates
+
+    Dates au format "AAAA-MM-JJ" ; retourne une liste de couples triés.
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    known = set(known_dates)
+
+    ranges = []
+    run_start = None
+    day = start
+    while day <= end:
+        if day.isoformat() in known:
+            if run_start is not None:
+                ranges.append((run_start, day - timedelta(days=1)))
+                run_start = None
+        elif run_start is None:
+            run_start = day
+        day += timedelta(days=1)
+    if run_start is not None:
+        ranges.append((run_start, end))
+
+    return [(a.isoformat(), b.isoformat()) for a, b in ranges]
+
+
+def split_range(start_date, end_date, chunk_days=CHUNK_DAYS):
+    """Découper une période en requêtes d'au plus chunk_days jours
+
+    Les coupures tombent aussi aux changements d'année : une année close
+    donne toujours la même requête, et donc la même entrée du cache HTTP.
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+
+    chunks = []
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=chunk_days - 1), date(start.year, 12, 31))
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+
+    return chunks
+
+
+class RegionalGrid:
+    """Grille d'une réponse POWER regional (GeoJSON), échantillonnée localement
+
+    Chaque cellule (feature) porte la série du paramètre à son centre. Un
+    lieu reçoit la série de la cellule la plus proche, comme l'endpoint
+    point qui renvoie la cellule contenant le point.
+    """
+
+    def __init__(self, data, parameter):
+        features = data["features"]
+        self.parameter = parameter
+        self.lons = np.array([f["geometry"]["coordinates"][0] for f in features], dtype=np.float64)
+        self.lats = np.array([f["geometry"]["coordinates"][1] for f in features], dtype=np.float64)
+        self.series = [f["properties"]["parameter"].get(parameter, {}) for f in features]
+
+    def __len__(self):
+        return len(self.series)
+
+    def nearest(self, lats, lons):
+        """Indice de la cellule la plus proche de chaque lieu (vectorisé)"""
+        lats = np.asarray(lats, dtype=np.float64)[:, None]
+        lons = np.asarray(lons, dtype=np.float64)[:, None]
+        return np.argmin((self.lats - lats) ** 2 + (self.lons - lons) ** 2, axis=1)
+
+    def sample(self, lats, lons):
+        """Séries ({"AAAAMMJJ": valeur}) de chaque lieu"""
+        return [self.series[i] for i in self.nearest(lats, lons)]
+
+
+class PowerClient:
+    """Téléchargements POWER (daily/point) sur une session partagée"""
+
+    def __init__(self, base_url=POWER_DAILY_POINT_URL, concurrency=8, retries=5,
+                 backoff=1.0, timeout=30, community="AG", cache=None,
+                 regional_url=POWER_DAILY_REGIONAL_URL):
+        self.base_url = base_url
+        self.regional_url = regional_url
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.community = community
+        self.session = create_session(self.concurrency, retries, backoff)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def fetch_point(self, lat, lon, start_date, end_date, parameters="PRECTOTCORR"):
+        """Réponse JSON de POWER pour un point (dates "AAAA-MM-JJ")"""
+        params = {
+            "parameters": parameters,
+            "community": self.community,
+            "longitude": lon,
+            "latitude": lat,
+            "start": start_date.replace("-", ""),  # 20250101
+            "end": end_date.replace("-", ""),      # 20250131
+            "format": "JSON"
+        }
+
+        return self._get(self.base_url, params, end_date)
+
+    def fetch_region(self, bbox, start_date, end_date, parameter):
+        """Réponse GeoJSON de POWER pour une zone (un seul paramètre)
+
+        bbox : (lat_min, lat_max, lon_min, lon_max) en degrés.
+        """
+        lat_min, lat_max, lon_min, lon_max = bbox
+        params = {
+            "parameters": parameter,
+            "community": self.community,
+            "latitude-min": lat_min,
+            "latitude-max": lat_max,
+            "longitude-min": lon_min,
+            "longitude-max": lon_max,
+            "start": start_date.replace("-", ""),
+            "end": end_date.replace("-", ""),
+            "format": "JSON"
+        }
+
+        return self._get(self.regional_url, params, end_date)
+
+    def _get(self, url, params, end_date):
+        """GET JSON, via le cache disque s'il est configuré"""
+        if self.cache is None:
+            return self._request(url, params, {})[1]
+
+        return self.cache.get(
+            url, params,
+            lambda headers: self._request(url, params, headers),
+            ttl=response_ttl(end_date)
+        )
+
+    def _request(self, url, params, headers):
+        """GET (éventuellement conditionnel) → (statut, JSON, etag, last_modified)"""
+        response = self.session.get(url, params=params, headers=headers,
+                                    timeout=self.timeout)
+        if response.status_code == 304:
+            return 304, None, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+        response.raise_for_status()
+        return (response.status_code, response.json(),
+                response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def fetch_many(self, jobs, parameters="PRECTOTCORR"):
+        """Exécuter plusieurs requêtes en parallèle
+
+        jobs : {clé: (lat, lon, début, fin)}. Retourne {clé: réponse JSON ou
+        None en cas d'échec}, dans l'ordre de jobs.
+        """
+        def fetch(key):
+            lat, lon, start_date, end_date = jobs[key]
+            return self.fetch_point(lat, lon, start_date, end_date, parameters)
+
+        return self._run_parallel(jobs, fetch)
+
+    def fetch_regions(self, jobs):
+        """Télécharger plusieurs grilles en parallèle
+
+        jobs : {clé: (bbox, début, fin, paramètre)}. Retourne {clé: réponse
+        GeoJSON ou None en cas d'échec}, dans l'ordre de jobs.
+        """
+        def fetch(key):
+            bbox, start_date, end_date, parameter = jobs[key]
+            return self.fetch_region(bbox, start_date, end_date, parameter)
+
+        return self._run_parallel(jobs, fetch)
+
+    def _run_parallel(self, jobs, fetch):
+        """fetch(clé) pour chaque clé, avec au plus self.concurrency requêtes en vol"""
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(fetch, key): key for key in jobs}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except (requests.RequestException, ValueError, CacheMiss) as e:
+                    results[key] = None
+                    label = " ".join(map(str, key)) if isinstance(key, tuple) else key
+                    print(f"  📡 {label} ❌ Erreur: {e}")
+
+        return {key: results[key] for key in jobs}
+
+    def fetch_points(self, points, start_date, end_date, parameters="PRECTOTCORR"):
+        """Télécharger plusieurs points sur la même période
+
+        points : {nom: (lat, lon)}. Retourne {nom: réponse JSON ou None}.
+        """
+        jobs = {name: (lat, lon, start_date, end_date) for name, (lat, lon) in points.items()}
+        return self.fetch_many(jobs, parameters)
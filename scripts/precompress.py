@@ -0,0 +1,148 @@
+"""
+Fichiers précompressés (.gz / .br) pour les sorties servies au navigateur
+IleRise - NASA Space Apps Challenge 2025
+
+Pour chaque sortie JSON/CSV, écrit à côté :
+    nasa-smap-benin.json.gz   gzip niveau 9
+    nasa-smap-benin.json.br   brotli qualité 11 (si le module est installé)
+
+La compression coûte du CPU une seule fois dans le pipeline, au lieu d'une
+compression à la volée (ou d'un transfert brut) à chaque chargement de page.
+Les fichiers sont compressés en parallèle ; le hash SHA-256 de chaque source
+est conservé dans un manifeste et une source inchangée n'est pas recompressée.
+
+Usage:
+    from precompress import precompress_outputs
+
+    precompress_outputs([json_file, csv_file], PRECOMPRESS_MANIFEST)
+
+Requis (optionnel, pour .br) :
+    pip install brotli
+"""
+
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sample_manifest import file_sha256
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def brotli_available():
+    """Le module brotli est-il installé ?"""
+    return brotli is not None
+
+
+def sidecar_paths(source):
+    """Chemins des versions compressées d'un fichier"""
+    source = Path(source)
+    paths = [source.with_name(source.name + ".gz")]
+    if brotli is not None:
+        paths.append(source.with_name(source.name + ".br"))
+    return paths
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compress_file(source):
+    """Écrire les versions .gz (et .br) d'un fichier ; retourne les tailles"""
+    source = Path(source)
+    data = source.read_bytes()
+
+    # mtime=0 : sortie identique d'une exécution à l'autre
+    gz_data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    _write_atomic(source.with_name(source.name + ".gz"), gz_data)
+    sizes = {"raw": len(data), "gz": len(gz_data)}
+
+    if brotli is not None:
+        br_data = brotli.compress(data, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+        _write_atomic(source.with_name(source.name + ".br"), br_data)
+        sizes["br"] = len(br_data)
+
+    return sizes
+
+
+def _load_hashes(manifest_file):
+    path = Path(manifest_file)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hashes(manifest_file, hashes):
+    path = Path(manifest_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": hashes}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def precompress_outputs(paths, manifest_file, workers=None):
+    """Compresser les fichiers dont le contenu a changé depuis la dernière fois
+
+    paths : fichiers à servir (les absents sont ignorés).
+    manifest_file : hash des sources déjà compressées, partagé entre scripts.
+    workers : nombre de processus (défaut : nombre de cœurs).
+
+    Retourne {chemin: tailles} pour les fichiers recompressés.
+    """
+    hashes = _load_hashes(manifest_file)
+    sources = [Path(p) for p in paths if Path(p).is_file()]
+
+    pending = []
+    digests = {}
+    for source in sources:
+        key = str(source.resolve())
+        digests[key] = file_sha256(source)
+        up_to_date = hashes.get(key) == digests[key] and all(p.exists() for p in sidecar_paths(source))
+        if not up_to_date:
+            pending.append(source)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending)))
+
+    if workers == 1:
+        results = [compress_file(source) for source in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress_file, pending))
+
+    compressed = dict(zip(pending, results))
+    for source in pending:
+        hashes[str(source.resolve())] = digests[str(source.resolve())]
+    if pending:
+        _save_hashes(manifest_file, hashes)
+
+    raw = sum(s["raw"] for s in results)
+    gz = sum(s["gz"] for s in results)
+    summary = f"🗜️  {len(pending)} compressés, {len(sources) - len(pending)} inchangés"
+    if pending:
+        summary += f" ({raw / 1024:.1f} KB → gz {gz / 1024:.1f} KB"
+        if brotli is not None:
+            summary += f", br {sum(s['br'] for s in results) / 1024:.1f} KB"
+        summary += ")"
+    print(summary)
+    if brotli is None and pending:
+        print("⚠️  brotli non installé : fichiers .br ignorés (pip install brotli)")
+
+    return compressed
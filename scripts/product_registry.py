@@ -0,0 +1,158 @@
+"""
+Registre de décodage des couches MODIS / SMAP (échelle, offset, fill, plage)
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque couche connue est décrite une seule fois : facteur d'échelle, offset,
+valeurs de remplissage, plage valide (en valeurs brutes, comme dans les
+métadonnées des produits) et unité. Le décodage s'applique en une opération
+NumPy sur tout un tableau : échantillons des villes, pixels d'une zone ou
+raster entier en mode dense.
+
+    valeur = brut × échelle + offset     (NaN si fill, nodata ou hors plage)
+
+Usage:
+    from product_registry import get_codec
+
+    lst = get_codec("MOD11A2.061", "LST_Day_1km")
+    celsius = lst.decode(raw_values)            # tableau → °C, NaN si invalide
+    values = lst(raw_window, dataset)           # décodeur (raw, dataset) des modes zonal/dense
+"""
+
+import numpy as np
+
+
+class LayerCodec:
+    """Décodage vectorisé d'une couche (brut → unité physique)"""
+
+    def __init__(self, product, layer, unit, scale=1.0, offset=0.0, fill=(), valid_range=None,
+                 description=""):
+        self.product = product
+        self.layer = layer
+        self.unit = unit
+        self.scale = scale
+        self.offset = offset
+        self.fill = tuple(fill)
+        self.valid_range = valid_range
+        self.description = description
+
+    def __repr__(self):
+        return f"LayerCodec({self.product} {self.layer}, ×{self.scale} {self.offset:+}, {self.unit})"
+
+    def signature(self):
+        """Paramètres de décodage (clé de cache des échantillons)"""
+        return {
+            "product": self.product,
+            "layer": self.layer,
+            "scale": self.scale,
+            "offset": self.offset,
+            "fill": list(self.fill),
+            "valid_range": None if self.valid_range is None else [str(v) for v in self.valid_range]
+        }
+
+    def mask(self, raw, nodata=None):
+        """True pour les valeurs brutes valides (ni fill, ni nodata, dans la plage)"""
+        raw = np.asarray(raw)
+        valid = np.isfinite(raw) if raw.dtype.kind == 'f' else np.ones(raw.shape, dtype=bool)
+
+        for fill in self.fill + (() if nodata is None else (nodata,)):
+            valid &= raw != fill
+
+        if self.valid_range is not None:
+            low, high = self.valid_range
+            valid &= (raw >= low) & (raw <= high)
+
+        return valid
+
+    def decode(self, raw, nodata=None):
+        """Valeurs physiques (float64), NaN pour les valeurs invalides"""
+        raw = np.asarray(raw)
+        values = raw.astype(np.float64) * self.scale + self.offset
+        values[~self.mask(raw, nodata)] = np.nan
+        return values
+
+    def __call__(self, raw, dataset=None):
+        """Décodeur decode(raw, dataset) des modes zonal et dense (nodata du GeoTIFF)"""
+        return self.decode(raw, None if dataset is None else dataset.nodata)
+
+
+def _codecs(product, layers, **common):
+    return {layer: LayerCodec(product, layer, **{**common, **spec}) for layer, spec in layers.items()}
+
+
+# Produit (sans version) → {couche: LayerCodec}
+PRODUCTS = {
+    "MOD11A2": {
+        # LST stockée en K × 50 : décodée directement en °C
+        **_codecs("MOD11A2", {
+            "LST_Day_1km": {"description": "Température de surface (jour)"},
+            "LST_Night_1km": {"description": "Température de surface (nuit)"},
+        }, unit="°C", scale=0.02, offset=-273.15, fill=(0,), valid_range=(7500, 65535)),
+        **_codecs("MOD11A2", {
+            "Emis_31": {"description": "Émissivité bande 31"},
+            "Emis_32": {"description": "Émissivité bande 32"},
+        }, unit="1", scale=0.002, offset=0.49, fill=(0,), valid_range=(1, 255)),
+        **_codecs("MOD11A2", {
+            "Day_view_time": {"description": "Heure locale d'observation (jour)"},
+            "Night_view_time": {"description": "Heure locale d'observation (nuit)"},
+        }, unit="h", scale=0.1, fill=(255,), valid_range=(0, 240)),
+        **_codecs("MOD11A2", {
+            "Day_view_angl": {"description": "Angle de visée (jour)"},
+            "Night_view_angl": {"description": "Angle de visée (nuit)"},
+        }, unit="degrés", offset=-65.0, fill=(255,), valid_range=(0, 130)),
+    },
+    "MOD13Q1": {
+        **_codecs("MOD13Q1", {
+            "NDVI": {"description": "Indice de végétation NDVI"},
+            "EVI": {"description": "Indice de végétation EVI"},
+        }, unit="1", scale=0.0001, fill=(-3000,), valid_range=(-2000, 10000)),
+        **_codecs("MOD13Q1", {
+            "red_reflectance": {}, "NIR_reflectance": {},
+            "blue_reflectance": {}, "MIR_reflectance": {},
+        }, unit="1", scale=0.0001, fill=(-1000,), valid_range=(0, 10000)),
+        **_codecs("MOD13Q1", {
+            "sun_zenith_angle": {}, "view_zenith_angle": {},
+        }, unit="degrés", scale=0.01, fill=(-10000,), valid_range=(-9000, 9000)),
+        **_codecs("MOD13Q1", {
+            "relative_azimuth_angle": {},
+        }, unit="degrés", scale=0.01, fill=(-4000,), valid_range=(-18000, 18000)),
+        **_codecs("MOD13Q1", {
+            "composite_day_of_the_year": {"description": "Jour de l'année du pixel retenu"},
+        }, unit="jour", fill=(-1,), valid_range=(1, 366)),
+    },
+    "SPL4SMGP": {
+        **_codecs("SPL4SMGP", {
+            "sm_surface": {"description": "Humidité du sol en surface (0-5cm)"},
+            "sm_rootzone": {"description": "Humidité du sol en zone racinaire (0-100cm)"},
+            "sm_profile": {"description": "Humidité du sol sur le profil"},
+        }, unit="m³/m³", fill=(-9999,), valid_range=(0.0, 1.0)),
+        **_codecs("SPL4SMGP", {
+            "baseflow_flux": {"description": "Écoulement de base"},
+        }, unit="kg/m²/s", fill=(-9999,), valid_range=(0.0, np.inf)),
+    },
+}
+
+
+def get_codec(product, layer):
+    """Décodeur d'une couche, ou None si elle n'est pas enregistrée
+
+    product : "MOD11A2" ou "MOD11A2.061" ; layer : nom court ou complet
+    ("sm_rootzone", "Geophysical_Data_sm_rootzone", "250m_16_days_NDVI").
+    """
+    layers = PRODUCTS.get(product.split(".")[0], {})
+    if layer in layers:
+        return layers[layer]
+
+    for name, codec in layers.items():
+        if layer.endswith(f"_{name}"):
+            return codec
+    return None
+
+
+def codec_for_dataset(product, layer, dataset):
+    """Décodeur enregistré, sinon construit depuis l'échelle/offset/nodata du GeoTIFF"""
+    codec = get_codec(product, layer)
+    if codec is not None:
+        return codec
+
+    return LayerCodec(product, layer, unit=dataset.units[0] or None,
+                      scale=dataset.scales[0], offset=dataset.offsets[0])
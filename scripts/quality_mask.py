@@ -0,0 +1,255 @@
+"""
+Masquage qualité (QC) des produits MODIS, dans la même lecture que la bande
+IleRise - NASA Space Apps Challenge 2025
+
+Les dossiers AppEEARS contiennent, pour chaque date, les couches de qualité
+du produit à côté de la bande scientifique :
+
+    MOD11A2.061_LST_Day_1km_doy2025001000000_aid0001.tif   (bande)
+    MOD11A2.061_QC_Day_doy2025001000000_aid0001.tif        (QC)
+
+Un QualityGroup ouvre la bande et ses couches QC de la même date, lit la
+même fenêtre (ou les mêmes blocs) dans chacune et décode les champs de bits
+de façon vectorisée : un masque booléen des pixels fiables accompagne chaque
+lecture, sans passe séparée sur l'archive.
+
+Règles par défaut :
+    MOD11A2 QC_Day/QC_Night : LST produite (bits 0-1 ≤ 01) et erreur LST
+                              ≤ 2 K (bits 6-7 ≤ 01)
+    MOD13Q1 pixel_reliability : 0 (bonne) ou 1 (marginale)
+    MOD13Q1 VI_Quality        : VI produit (bits 0-1 ≤ 01), utilité ≤ 1011
+                                (bits 2-5), ni nuages mixtes (bit 10), ni
+                                neige (bit 14), ni ombre (bit 15)
+
+Une couche QC absente n'élimine rien (avertissement dans le résumé).
+
+Usage:
+    from quality_mask import QualityMask
+
+    quality = QualityMask("LST_Day_1km")
+    with quality.open(tif_path) as group:
+        values, inside, good = group.sample(plan)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import rasterio
+
+MAX_LST_ERROR_CODE = 1      # Bits 6-7 de QC_Day/QC_Night : 00 ≤ 1 K, 01 ≤ 2 K, 10 ≤ 3 K, 11 > 3 K
+MAX_VI_USEFULNESS = 0b1011  # Bits 2-5 de VI_Quality : 0000 (meilleure) … 1111 (inutilisable)
+
+
+def decode_lst_qc(qc):
+    """QC_Day / QC_Night (MOD11A2, uint8) → True si le pixel est fiable"""
+    qc = np.asarray(qc).astype(np.uint8)
+    mandatory = qc & 0b11
+    lst_error = (qc >> 6) & 0b11
+    return (mandatory <= 0b01) & (lst_error <= MAX_LST_ERROR_CODE)
+
+
+def decode_pixel_reliability(reliability):
+    """pixel_reliability (MOD13Q1) → True si bonne ou marginale (-1 = fill)"""
+    reliability = np.asarray(reliability)
+    return (reliability == 0) | (reliability == 1)
+
+
+def decode_vi_quality(qc):
+    """VI_Quality (MOD13Q1, uint16) → True si le pixel est fiable"""
+    qc = np.asarray(qc).astype(np.uint16)
+    produced = (qc & 0b11) <= 0b01
+    useful = ((qc >> 2) & 0b1111) <= MAX_VI_USEFULNESS
+    mixed_clouds = (qc >> 10) & 1
+    snow = (qc >> 14) & 1
+    shadow = (qc >> 15) & 1
+    return produced & useful & (mixed_clouds == 0) & (snow == 0) & (shadow == 0)
+
+
+VI_RULES = {
+    "pixel_reliability": decode_pixel_reliability,
+    "VI_Quality": decode_vi_quality
+}
+
+# Couche scientifique → {couche QC de la même date: décodeur}
+QC_LAYERS = {
+    "LST_Day_1km": {"QC_Day": decode_lst_qc},
+    "LST_Night_1km": {"QC_Night": decode_lst_qc},
+    "NDVI": VI_RULES,
+    "EVI": VI_RULES
+}
+
+
+def qc_rules(layer):
+    """Règles QC d'une couche, nom court ou complet ("250m_16_days_NDVI" → règles de "NDVI")"""
+    for name, rules in QC_LAYERS.items():
+        if layer == name or layer.endswith(f"_{name}"):
+            return rules
+    return {}
+
+
+def companion_path(path, layer, qc_layer):
+    """Chemin de la couche QC de la même date ("_NDVI_doy" → "_VI_Quality_doy")"""
+    path = Path(path)
+    marker = f"_{layer}_doy"
+    if marker not in path.name:
+        return None
+    return path.with_name(path.name.replace(marker, f"_{qc_layer}_doy"))
+
+
+def same_grid(a, b):
+    """Deux datasets sur la même grille (CRS, transform, taille) ?"""
+    return (a.crs == b.crs and a.transform == b.transform
+            and a.height == b.height and a.width == b.width)
+
+
+class QualityMask:
+    """Règles QC d'une couche scientifique et compteurs de pixels rejetés
+
+    Les décodeurs sont des fonctions de module : l'objet peut être transmis
+    à des processus de travail.
+    """
+
+    def __init__(self, layer=None, rules=None):
+        self.layer = layer
+        self.rules = dict(QC_LAYERS.get(layer, {}) if rules is None else rules)
+        self.checked = 0
+        self.rejected = 0
+        self.missing = set()
+
+    def companions(self, path):
+        """Couches QC présentes pour un fichier : {couche QC: chemin}"""
+        found = {}
+        for qc_layer in self.rules:
+            qc_path = companion_path(path, self.layer, qc_layer)
+            if qc_path is not None and qc_path.exists():
+                found[qc_layer] = qc_path
+            else:
+                self.missing.add(qc_layer)
+        return found
+
+    def open(self, path):
+        """Ouvrir la bande et ses couches QC (gestionnaire de contexte)"""
+        return QualityGroup(self, path)
+
+    def signature(self):
+        """Règles et seuils, pour invalider les échantillons mis en cache s'ils changent"""
+        return {
+            "layer": self.layer,
+            "rules": {qc_layer: f"{rule.__module__}.{rule.__name__}" for qc_layer, rule in self.rules.items()},
+            "max_lst_error_code": MAX_LST_ERROR_CODE,
+            "max_vi_usefulness": MAX_VI_USEFULNESS
+        }
+
+    def count(self, good):
+        self.checked += good.size
+        self.rejected += int(good.size - np.count_nonzero(good))
+
+    def fresh(self):
+        """Même couche et mêmes règles, compteurs à zéro"""
+        return QualityMask(self.layer, self.rules)
+
+    def counts(self):
+        """Compteurs transmissibles entre processus : (contrôlés, rejetés, couches absentes)"""
+        return self.checked, self.rejected, sorted(self.missing)
+
+    def merge(self, counts):
+        """Ajouter les compteurs (counts()) d'un processus de travail"""
+        checked, rejected, missing = counts
+        self.checked += checked
+        self.rejected += rejected
+        self.missing.update(missing)
+
+    def summary(self):
+        if not self.rules:
+            return f"🛡️  QC : aucune règle pour {self.layer}"
+
+        text = f"🛡️  QC ({', '.join(self.rules)}) : "
+        if self.checked:
+            text += f"{self.rejected}/{self.checked} pixels rejetés ({100 * self.rejected / self.checked:.1f}%)"
+        else:
+            text += "aucun pixel contrôlé"
+        if self.missing:
+            text += f" | ⚠️  couches absentes : {', '.join(sorted(self.missing))}"
+        return text
+
+
+def open_group(path, quality=None):
+    """QualityGroup d'un fichier (sans couche QC si quality est None)"""
+    return (quality or QualityMask()).open(path)
+
+
+class QualityGroup:
+    """Bande scientifique et couches QC d'une même date, lues ensemble"""
+
+    def __init__(self, quality, path):
+        self.quality = quality
+        self.dataset = rasterio.open(path)
+        self.qc = {}
+
+        # Échec sur une couche QC : la bande et les QC déjà ouvertes sont refermées
+        try:
+            for qc_layer, qc_path in quality.companions(path).items():
+                qc_dataset = rasterio.open(qc_path)
+                if same_grid(self.dataset, qc_dataset):
+                    self.qc[qc_layer] = qc_dataset
+                else:
+                    qc_dataset.close()
+                    quality.missing.add(qc_layer)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for qc_dataset in self.qc.values():
+            qc_dataset.close()
+        self.dataset.close()
+
+    def _good(self, qc_values):
+        """Combiner les masques de chaque couche QC (ET logique)"""
+        good = None
+        for qc_layer, values in qc_values.items():
+            layer_good = self.quality.rules[qc_layer](values)
+            good = layer_good if good is None else good & layer_good
+        self.quality.count(good)
+        return good
+
+    def read(self, window=None, band=1, pixels=None):
+        """Bande et masque de fiabilité sur la même fenêtre → (raw, good)
+
+        pixels : indices à plat dans la fenêtre ; seuls ces pixels sont
+        retournés (et leurs QC décodés).
+        """
+        def select(data):
+            return data if pixels is None else data.ravel()[pixels]
+
+        raw = select(self.dataset.read(band, window=window))
+        if not self.qc:
+            return raw, np.ones(raw.shape, dtype=bool)
+
+        return raw, self._good({
+            qc_layer: select(qc_dataset.read(1, window=window))
+            for qc_layer, qc_dataset in self.qc.items()
+        })
+
+    def sample(self, plan, band=1):
+        """Échantillonnage ponctuel (SamplingPlan) de la bande et des QC
+
+        Retourne (values, inside, good) ; les blocs lus sont les mêmes pour
+        chaque couche (même grille, mêmes positions).
+        """
+        values, inside = plan.sample(self.dataset, band)
+        if not self.qc:
+            return values, inside, np.ones(len(values), dtype=bool)
+
+        qc_values = {qc_layer: plan.sample(qc_dataset)[0] for qc_layer, qc_dataset in self.qc.items()}
+        good = self._good({qc_layer: v[inside] for qc_layer, v in qc_values.items()})
+
+        full = np.zeros(len(values), dtype=bool)
+        full[inside] = good
+        return values, inside, full
@@ -0,0 +1,114 @@
+"""
+Échantillonnage ponctuel des GeoTIFF NASA pour les villes du Bénin
+IleRise - NASA Space Apps Challenge 2025
+
+Tous les fichiers d'un même produit partagent la même projection, la même
+transformation affine et la même taille. Le plan d'échantillonnage reprojette
+donc toutes les villes en un seul appel, puis calcule leurs positions
+ligne/colonne une seule fois par grille, et les réutilise pour chaque fichier.
+
+La lecture regroupe les pixels demandés par bloc interne (tuile GeoTIFF) :
+chaque bloc touché est lu une seule fois via une fenêtre, au lieu de décoder
+toute la bande pour chaque ville.
+
+Usage:
+    from raster_sampling import SamplingPlan
+
+    plan = SamplingPlan(CITIES)
+    with rasterio.open(tif_path) as dataset:
+        values, inside = plan.sample(dataset)
+
+Requis:
+    pip install rasterio numpy
+"""
+
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.transform import rowcol
+from rasterio.warp import transform as warp_transform
+
+WGS84 = CRS.from_epsg(4326)
+
+
+class SamplingPlan:
+    """Positions pixel des villes, mises en cache par grille raster"""
+
+    def __init__(self, cities):
+        # cities : {"Cotonou": {"lat": ..., "lon": ...}, ...}
+        self.names = list(cities.keys())
+        self.lons = [cities[name]["lon"] for name in self.names]
+        self.lats = [cities[name]["lat"] for name in self.names]
+
+        self._projected = {}  # CRS (WKT) → (xs, ys)
+        self._grids = {}      # (CRS, transform, shape) → (rows, cols, inside)
+        self.reprojections = 0
+        self.blocks_read = 0
+
+    def grid_key(self, dataset):
+        """Clé identifiant la grille d'un dataset (CRS, transform, taille)"""
+        return (
+            dataset.crs.to_wkt(),
+            tuple(dataset.transform)[:6],
+            dataset.height,
+            dataset.width
+        )
+
+    def project(self, crs):
+        """Coordonnées projetées de toutes les villes (un seul appel par CRS)"""
+        crs_key = crs.to_wkt()
+
+        if crs_key not in self._projected:
+            xs, ys = warp_transform(WGS84, crs, self.lons, self.lats)
+            self._projected[crs_key] = (np.asarray(xs), np.asarray(ys))
+            self.reprojections += 1
+
+        return self._projected[crs_key]
+
+    def locate(self, dataset):
+        """Indices (rows, cols) des villes et masque des villes dans le raster"""
+        key = self.grid_key(dataset)
+
+        if key not in self._grids:
+            xs, ys = self.project(dataset.crs)
+            rows, cols = rowcol(dataset.transform, xs, ys)
+            rows = np.asarray(rows, dtype=np.int64)
+            cols = np.asarray(cols, dtype=np.int64)
+
+            inside = (
+                (rows >= 0) & (rows < dataset.height) &
+                (cols >= 0) & (cols < dataset.width)
+            )
+            self._grids[key] = (rows, cols, inside)
+
+        return self._grids[key]
+
+    def sample(self, dataset, band=1):
+        """Valeurs brutes de toutes les villes, en lisant chaque bloc touché une fois
+
+        Retourne (values, inside) : les valeurs hors raster (inside False)
+        ne sont pas significatives.
+        """
+        rows, cols, inside = self.locate(dataset)
+        values = np.zeros(len(self.names), dtype=dataset.dtypes[band - 1])
+
+        if not inside.any():
+            return values, inside
+
+        # Regrouper les pixels par bloc interne
+        block_height, block_width = dataset.block_shapes[band - 1]
+        block_rows = rows // block_height
+        block_cols = cols // block_width
+        blocks = np.unique(np.stack([block_rows[inside], block_cols[inside]], axis=1), axis=0)
+
+        for block_row, block_col in blocks:
+            window = dataset.block_window(band, int(block_row), int(block_col))
+            data = dataset.read(band, window=window)
+            self.blocks_read += 1
+
+            selected = inside & (block_rows == block_row) & (block_cols == block_col)
+            values[selected] = data[
+                rows[selected] - int(window.row_off),
+                cols[selected] - int(window.col_off)
+            ]
+
+        return values, inside
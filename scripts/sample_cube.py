@@ -0,0 +1,91 @@
+"""
+Cube d'échantillons temps × lieux pour les séries NASA
+IleRise - NASA Space Apps Challenge 2025
+
+Les valeurs extraites sont stockées dans un tableau float32 dense de forme
+(horodatages, lieux), avec un axe datetime64 parallèle. NaN signale une
+donnée manquante. Les agrégations (moyenne journalière, dernière valeur,
+min/max) sont des réductions NumPy vectorisées, sans dict par mesure ;
+les agrégations par période (jour, semaine ISO, décade, mois, N heures)
+passent par time_resample.
+
+Usage:
+    from sample_cube import SampleCube
+
+    cube = SampleCube(times, samples, city_names)
+    days, daily = cube.daily_mean(decimals=3)
+    dekads = cube.resample("dekad", stats=("mean", "min", "max"))
+"""
+
+import numpy as np
+
+from time_resample import resample
+
+
+def to_sample_vector(samples):
+    """Liste de valeurs (None = absente) → vecteur float32 avec NaN"""
+    return np.array([np.nan if v is None else v for v in samples], dtype=np.float32)
+
+
+def last_valid_index(values):
+    """Indice de la dernière ligne non-NaN de chaque colonne (-1 si aucune)"""
+    valid = ~np.isnan(values)
+    if len(values) == 0:
+        return np.full(values.shape[1:], -1, dtype=np.intp)
+
+    last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+    return np.where(valid.any(axis=0), last, -1)
+
+
+class SampleCube:
+    """Échantillons (temps, lieux) en float32 triés par horodatage"""
+
+    def __init__(self, times, values, locations):
+        self.locations = list(locations)
+
+        times = np.asarray(times, dtype='datetime64[s]')
+        values = np.asarray(values, dtype=np.float32).reshape(len(times), len(self.locations))
+
+        # Tri stable : à horodatage égal, l'ordre d'arrivée est conservé.
+        # Déjà trié (ex. cube relu depuis le disque) : aucune copie.
+        if np.all(times[1:] >= times[:-1]):
+            self.times = times
+            self.values = values
+        else:
+            order = np.argsort(times, kind='stable')
+            self.times = times[order]
+            self.values = values[order]
+
+    def resample(self, freq="day", stats=("mean",), decimals=None, complete=False):
+        """Statistiques par période (time_resample.resample) : Resampled (périodes × lieux)"""
+        return resample(self.times, self.values, freq, stats, decimals, complete)
+
+    def daily_mean(self, decimals=None):
+        """Moyenne journalière par lieu (jours présents uniquement)
+
+        decimals arrondit chaque mesure (en float64) avant la moyenne, comme
+        la précision de stockage des sorties. Retourne (jours, moyennes) avec
+        NaN pour un jour sans mesure valide.
+        """
+        daily = self.resample("day", ("mean",), decimals)
+        return daily.starts, daily["mean"]
+
+    def latest(self):
+        """Dernière valeur valide et son horodatage pour chaque lieu"""
+        index = last_valid_index(self.values)
+        has_data = index >= 0
+
+        values = np.full(len(self.locations), np.nan, dtype=np.float32)
+        times = np.full(len(self.locations), np.datetime64('NaT'), dtype='datetime64[s]')
+        values[has_data] = self.values[index[has_data], np.flatnonzero(has_data)]
+        times[has_data] = self.times[index[has_data]]
+
+        return values, times
+
+    def minimum(self):
+        """Minimum par lieu (NaN si aucune mesure)"""
+        return np.fmin.reduce(self.values, axis=0, initial=np.nan)
+
+    def maximum(self):
+        """Maximum par lieu (NaN si aucune mesure)"""
+        return np.fmax.reduce(self.values, axis=0, initial=np.nan)
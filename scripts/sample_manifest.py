@@ -0,0 +1,166 @@
+"""
+Manifeste des GeoTIFF déjà traités (traitement incrémental)
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque fichier raster est identifié par son chemin, sa taille, sa date de
+modification et un hash SHA-256 de son contenu. Le manifeste conserve les
+échantillons extraits par ville : une relance ne rouvre que les rasters
+nouveaux ou modifiés. Les fichiers associés (couches QC de la même date)
+sont suivis par taille et date de modification : en ajouter, en retirer ou
+en modifier un invalide les échantillons.
+
+Le manifeste enregistre aussi la signature de l'extraction : coordonnées
+des villes et règles appliquées avant stockage (couches QC et seuils,
+décodage). Une ville déplacée ou une règle modifiée rend tout le cache
+inutilisable. Supprimer le fichier manifeste force un retraitement complet.
+
+Usage:
+    from sample_manifest import SampleManifest, extraction_signature
+
+    signature = extraction_signature(CITIES, quality=quality, codec=LST_CODEC)
+    manifest = SampleManifest(MANIFEST_FILE, city_names, signature)
+    samples = manifest.lookup(tif_path)
+    if samples is None:
+        samples = ...  # extraction
+        manifest.store(tif_path, samples)
+    manifest.prune(tif_files)
+    manifest.save()
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Hash SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extraction_signature(cities, **rules):
+    """Signature JSON de l'extraction
+
+    cities : {ville: {"lat", "lon"}} ; rules : objets appliqués avant le
+    stockage des échantillons (QualityMask, LayerCodec, ou dict de ceux-ci),
+    réduits à leur méthode signature().
+    """
+    def reduce(rule):
+        if rule is None:
+            return None
+        if isinstance(rule, dict):
+            return {name: reduce(value) for name, value in rule.items()}
+        return rule.signature()
+
+    signature = {
+        "cities": {name: [coords["lat"], coords["lon"]] for name, coords in cities.items()},
+        **{name: reduce(rule) for name, rule in rules.items()}
+    }
+    # Aller-retour JSON : tuples → listes, comparable au manifeste relu
+    return json.loads(json.dumps(signature))
+
+
+class SampleManifest:
+    """Échantillons par ville des rasters déjà ingérés, persistés en JSON"""
+
+    def __init__(self, manifest_file, city_names, signature=None):
+        self.path = Path(manifest_file)
+        self.city_names = list(city_names)
+        self.signature = signature
+        self.files = {}
+        self.hits = 0
+        self.misses = 0
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Manifeste illisible, reconstruction complète : {e}")
+                data = {}
+
+            # Liste de villes, coordonnées ou règles différentes → échantillons inutilisables
+            if data.get("version") == MANIFEST_VERSION and data.get("cities") == self.city_names:
+                if data.get("signature") == self.signature:
+                    self.files = data.get("files", {})
+                elif data.get("files"):
+                    print("⚠️  Villes ou règles d'extraction modifiées : manifeste ignoré")
+
+    def _key(self, file_path):
+        return str(Path(file_path).resolve())
+
+    def _companions(self, companions):
+        signature = {}
+        for path in companions:
+            stat = os.stat(path)
+            signature[Path(path).name] = [stat.st_size, stat.st_mtime_ns]
+        return signature
+
+    def lookup(self, file_path, companions=()):
+        """Échantillons mis en cache, ou None si le fichier (ou un associé) est nouveau ou modifié"""
+        entry = self.files.get(self._key(file_path))
+        if entry is None or entry.get("companions", {}) != self._companions(companions):
+            self.misses += 1
+            return None
+
+        stat = os.stat(file_path)
+        if entry["size"] != stat.st_size:
+            self.misses += 1
+            return None
+
+        # Date de modification changée : vérifier le contenu avant de relire
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if entry["sha256"] != file_sha256(file_path):
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        self.hits += 1
+        return entry["samples"]
+
+    def store(self, file_path, samples, companions=()):
+        """Enregistrer les échantillons d'un fichier (une valeur ou None par ville)
+
+        companions : fichiers associés utilisés pour l'extraction (couches QC).
+        """
+        stat = os.stat(file_path)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(file_path),
+            "samples": list(samples)
+        }
+        if companions:
+            entry["companions"] = self._companions(companions)
+        self.files[self._key(file_path)] = entry
+
+    def prune(self, file_paths):
+        """Oublier les fichiers qui ne sont plus présents"""
+        keep = {self._key(p) for p in file_paths}
+        for key in list(self.files):
+            if key not in keep:
+                del self.files[key]
+
+    def save(self):
+        """Écrire le manifeste (écriture atomique)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "cities": self.city_names,
+                "signature": self.signature,
+                "files": self.files
+            }, f, ensure_ascii=False)
+
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        return f"♻️  Manifeste : {self.hits} fichiers réutilisés, {self.misses} extraits"
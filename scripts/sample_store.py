@@ -0,0 +1,105 @@
+"""
+Stockage binaire des échantillons (temps × lieux) par produit
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque produit est écrit sous forme de trois fichiers :
+    <produit>.values.npy   matrice float32 (horodatages, lieux), NaN = absent
+    <produit>.times.npy    axe datetime64[s]
+    <produit>.json         en-tête : lieux, coordonnées, forme, période
+
+Les .npy s'ouvrent en mémoire projetée (mmap) : relire une année de SMAP
+ne demande ni analyse JSON ni réouverture des rasters.
+
+Usage:
+    python sample_store.py [dossier]      # lister les produits disponibles
+
+    from sample_store import open_sample_store
+    cube, header = open_sample_store(SAMPLES_DIR, "smap-sm_rootzone")
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from sample_cube import SampleCube
+
+DEFAULT_DIR = Path("raw-nasa-data/.cache/samples")
+
+
+def store_paths(directory, product):
+    """Chemins (valeurs, temps, en-tête) d'un produit"""
+    directory = Path(directory)
+    return (
+        directory / f"{product}.values.npy",
+        directory / f"{product}.times.npy",
+        directory / f"{product}.json"
+    )
+
+
+def write_sample_store(directory, product, cube, coordinates=None, attrs=None):
+    """Écrire la matrice d'échantillons d'un cube et son en-tête"""
+    values_path, times_path, header_path = store_paths(directory, product)
+    header_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Ancien en-tête retiré avant de réécrire les .npy : une écriture
+    # interrompue laisse un produit sans en-tête (ignoré), jamais un en-tête
+    # décrivant des matrices d'une autre forme
+    header_path.unlink(missing_ok=True)
+
+    np.save(values_path, np.ascontiguousarray(cube.values, dtype=np.float32))
+    np.save(times_path, np.ascontiguousarray(cube.times, dtype='datetime64[s]'))
+
+    times = cube.times
+    header = {
+        "product": product,
+        "shape": list(cube.values.shape),
+        "dtype": "float32",
+        "time_unit": "s",
+        "start": str(times[0]) if len(times) else None,
+        "end": str(times[-1]) if len(times) else None,
+        "locations": cube.locations,
+        "coordinates": coordinates or {},
+        "attrs": attrs or {},
+        "lastUpdate": datetime.now().strftime("%Y-%m-%d")
+    }
+
+    # En-tête écrit en dernier : sa présence signale des .npy complets
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    return header_path
+
+
+def open_sample_store(directory, product, mmap=True):
+    """Ouvrir un produit stocké ; les tableaux restent en mémoire projetée"""
+    values_path, times_path, header_path = store_paths(directory, product)
+
+    with open(header_path, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+
+    mode = 'r' if mmap else None
+    values = np.load(values_path, mmap_mode=mode)
+    times = np.load(times_path, mmap_mode=mode)
+
+    return SampleCube(times, values, header["locations"]), header
+
+
+def list_sample_stores(directory):
+    """En-têtes de tous les produits d'un dossier"""
+    headers = []
+    for header_path in sorted(Path(directory).glob("*.json")):
+        with open(header_path, 'r', encoding='utf-8') as f:
+            headers.append(json.load(f))
+    return headers
+
+
+if __name__ == "__main__":
+    directory = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DIR
+
+    print(f"📂 Échantillons dans : {directory}")
+    for header in list_sample_stores(directory):
+        rows, cols = header["shape"]
+        print(f"   {header['product']:25} : {rows} dates × {cols} lieux ({header['start']} → {header['end']})")
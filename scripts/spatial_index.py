@@ -0,0 +1,148 @@
+"""
+Index spatial des lieux (plus proche voisin, rayon) en distance géodésique
+IleRise - NASA Space Apps Challenge 2025
+
+Les lieux sont projetés sur la sphère unité (x, y, z) et rangés dans un
+KD-tree : la distance en ligne droite entre deux points de la sphère
+(corde) croît avec la distance orthodromique, le plus proche voisin est donc
+le même. Les distances retournées sont des kilomètres haversine.
+
+Sans scipy, une recherche NumPy par blocs (produit scalaire) donne les
+mêmes résultats, plus lentement pour les gros volumes.
+
+Usage:
+    from spatial_index import LocationIndex
+
+    index = LocationIndex.from_dict(BENIN_CITIES)
+    nearest, distance_km = index.nearest(lats, lons, max_km=111.2)
+    nearby = index.within(6.37, 2.38, radius_km=50)
+
+Requis (optionnel, recommandé pour les gros volumes) :
+    pip install scipy
+"""
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+EARTH_RADIUS_KM = 6371.0088
+BRUTE_FORCE_BLOCK = 1 << 22   # Paires point × lieu par bloc sans scipy
+
+
+def to_unit_xyz(lats, lons):
+    """Coordonnées (degrés) → vecteurs de la sphère unité, forme (n, 3)"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en km (vectorisée)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def km_to_chord(distance_km):
+    """Distance orthodromique (km) → corde sur la sphère unité"""
+    angle = np.minimum(np.asarray(distance_km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+class LocationIndex:
+    """Lieux nommés interrogeables par lots (plus proche voisin, rayon)"""
+
+    def __init__(self, names, lats, lons):
+        self.names = list(names)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.xyz = to_unit_xyz(self.lats, self.lons)
+        self.tree = cKDTree(self.xyz) if cKDTree is not None and len(self.names) else None
+
+    @classmethod
+    def from_dict(cls, locations):
+        """Index depuis {nom: {"lat": ..., "lon": ...}}"""
+        names = list(locations)
+        return cls(names,
+                   [locations[name]["lat"] for name in names],
+                   [locations[name]["lon"] for name in names])
+
+    def __len__(self):
+        return len(self.names)
+
+    def nearest(self, lats, lons, max_km=None):
+        """Lieu le plus proche de chaque point
+
+        Retourne (indices, distances en km). Indice -1 (distance inf) pour un
+        point sans coordonnées ou plus loin que max_km de tout lieu.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+
+        indices = np.full(len(lats), -1, dtype=np.intp)
+        distances = np.full(len(lats), np.inf)
+
+        valid = ~(np.isnan(lats) | np.isnan(lons))
+        if not len(self) or not valid.any():
+            return indices, distances
+
+        points = to_unit_xyz(lats[valid], lons[valid])
+        if self.tree is not None:
+            # Borne sur la corde : le KD-tree élague les branches trop lointaines
+            bound = np.inf if max_km is None else km_to_chord(max_km) * (1 + 1e-9)
+            _, found = self.tree.query(points, k=1, distance_upper_bound=bound, workers=-1)
+        else:
+            found = self._nearest_brute_force(points)
+
+        # Au-delà de la borne, le KD-tree renvoie len(self)
+        keep = found < len(self)
+        found = np.where(keep, found, 0)
+        found_km = haversine_km(lats[valid], lons[valid], self.lats[found], self.lons[found])
+        if max_km is not None:
+            keep &= found_km <= max_km
+
+        rows = np.flatnonzero(valid)[keep]
+        indices[rows] = found[keep]
+        distances[rows] = found_km[keep]
+        return indices, distances
+
+    def _nearest_brute_force(self, points):
+        # Plus grand produit scalaire = plus petit angle ; blocs pour borner la mémoire
+        block = max(1, BRUTE_FORCE_BLOCK // len(self))
+        found = np.empty(len(points), dtype=np.intp)
+        for start in range(0, len(points), block):
+            found[start:start + block] = np.argmax(points[start:start + block] @ self.xyz.T, axis=1)
+        return found
+
+    def within(self, lat, lon, radius_km):
+        """Indices des lieux à moins de radius_km d'un point, du plus proche au plus loin"""
+        return self.within_many([lat], [lon], radius_km)[0]
+
+    def within_many(self, lats, lons, radius_km):
+        """within() pour un lot de points : une liste d'indices par point"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        points = to_unit_xyz(lats, lons)
+        # Marge sur la corde : le tri final se fait en km haversine
+        chord = km_to_chord(radius_km) * (1 + 1e-9)
+
+        results = []
+        for i, point in enumerate(points):
+            if np.isnan(point).any() or not len(self):
+                results.append(np.zeros(0, dtype=np.intp))
+                continue
+
+            if self.tree is not None:
+                candidates = np.asarray(self.tree.query_ball_point(point, chord), dtype=np.intp)
+            else:
+                candidates = np.flatnonzero(np.linalg.norm(self.xyz - point, axis=1) <= chord)
+
+            km = haversine_km(lats[i], lons[i], self.lats[candidates], self.lons[candidates])
+            order = np.argsort(km, kind='stable')
+            results.append(candidates[order][km[order] <= radius_km])
+
+        return results
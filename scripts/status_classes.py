@@ -0,0 +1,104 @@
+"""
+Classification par seuils vectorisée, sortie encodée en dictionnaire
+IleRise - NASA Space Apps Challenge 2025
+
+Les interprétations (statut, libellé, couleur, recommandation) ne sont plus
+recopiées dans chaque entrée de série : toutes les valeurs d'un tableau sont
+classées en une opération (np.digitize sur les seuils), chaque entrée reçoit
+un petit code entier et la table des classes est écrite une seule fois par
+fichier.
+
+    code 0        : valeur absente (NaN)
+    code 1..n     : classes dans l'ordre des seuils croissants
+
+Une valeur égale à un seuil tombe dans la classe supérieure, comme dans les
+cascades "if valeur < seuil" d'origine.
+
+Usage:
+    from status_classes import ThresholdClasses
+
+    classes = ThresholdClasses([10, 20], [
+        {"status": "dry"}, {"status": "moderate"}, {"status": "wet"}
+    ], unknown={"status": "unknown"})
+
+    codes = classes.classify(values)        # tableau → int8 (0 = inconnu)
+    classes.describe(12.5)                  # {"status": "moderate"}
+    classes.legend()                        # table écrite une fois par fichier
+
+Les tables NDVI et humidité du sol sont définies ici, sans dépendance aux
+rasters : convert_json_to_csv les relit sans importer la chaîne GDAL.
+"""
+
+import numpy as np
+
+UNKNOWN_CODE = 0
+
+
+class ThresholdClasses:
+    """Classes délimitées par des seuils croissants"""
+
+    def __init__(self, thresholds, classes, unknown):
+        if len(classes) != len(thresholds) + 1:
+            raise ValueError(f"{len(thresholds)} seuils → {len(thresholds) + 1} classes attendues, "
+                             f"{len(classes)} fournies")
+
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        if np.any(np.diff(self.thresholds) <= 0):
+            raise ValueError("Seuils non strictement croissants")
+
+        # Indice = code : inconnu en 0, puis les classes
+        self.classes = [dict(unknown)] + [dict(c) for c in classes]
+        self._statuses = np.array([c["status"] for c in self.classes])
+
+    def __len__(self):
+        return len(self.classes)
+
+    def classify(self, values):
+        """Codes (int8) de toutes les valeurs en une opération, UNKNOWN_CODE pour NaN"""
+        values = np.asarray(values, dtype=np.float64)
+        codes = (np.digitize(values, self.thresholds) + 1).astype(np.int8)
+        codes[np.isnan(values)] = UNKNOWN_CODE
+        return codes
+
+    def statuses(self, codes):
+        """Codes → identifiants de statut ("dry", ...), vectorisé"""
+        return self._statuses[np.asarray(codes, dtype=np.intp)]
+
+    def describe(self, value):
+        """Classe complète d'une seule valeur (None ou NaN → inconnu)"""
+        code = self.classify([np.nan if value is None else value])[0]
+        return dict(self.classes[code])
+
+    def legend(self):
+        """Table des classes : code, bornes [min, max[ et libellés"""
+        bounds = [None] + self.thresholds.tolist() + [None]
+        table = [{"code": UNKNOWN_CODE, "min": None, "max": None, **self.classes[0]}]
+        for code in range(1, len(self.classes)):
+            table.append({"code": code, "min": bounds[code - 1], "max": bounds[code], **self.classes[code]})
+        return table
+
+
+# Classes de santé de la végétation : seuils NDVI 0 / 0.2 / 0.4 / 0.6 / 0.8
+NDVI_CLASSES = ThresholdClasses([0, 0.2, 0.4, 0.6, 0.8], [
+    {"status": "water", "health": "Eau", "color": "blue"},
+    {"status": "bare", "health": "Sol nu / Très mauvaise", "color": "brown"},
+    {"status": "poor", "health": "Végétation faible", "color": "orange"},
+    {"status": "moderate", "health": "Bonne santé", "color": "lightgreen"},
+    {"status": "good", "health": "Excellente santé", "color": "green"},
+    {"status": "excellent", "health": "Végétation très dense", "color": "darkgreen"}
+], unknown={"status": "unknown", "health": "Données manquantes", "color": "gray"})
+
+# Classes d'humidité (%) pour agriculteurs : seuils 10 / 20 / 30 / 40
+SOIL_MOISTURE_CLASSES = ThresholdClasses([10, 20, 30, 40], [
+    {"status": "very_dry", "description": "Sol très sec",
+     "recommendation": "Irrigation urgente nécessaire", "color": "brown"},
+    {"status": "dry", "description": "Sol sec",
+     "recommendation": "Irrigation recommandée", "color": "orange"},
+    {"status": "moderate", "description": "Humidité modérée",
+     "recommendation": "Surveiller, irrigation possible", "color": "yellow"},
+    {"status": "good", "description": "Bonne humidité",
+     "recommendation": "Niveau optimal pour la plupart des cultures", "color": "lightgreen"},
+    {"status": "saturated", "description": "Sol saturé",
+     "recommendation": "Risque d'excès d'eau, drainage nécessaire", "color": "blue"}
+], unknown={"status": "unknown", "description": "Données non disponibles",
+            "recommendation": "Vérifier manuellement", "color": "gray"})
@@ -0,0 +1,366 @@
+"""
+Rééchantillonnage temporel des séries temps × lieux (heures, jour, semaine, décade, mois)
+IleRise - NASA Space Apps Challenge 2025
+
+Chaque horodatage reçoit l'identifiant entier de sa période ; l'axe des
+temps étant trié, les périodes sont des tranches contiguës et toutes les
+statistiques (mean, min, max, sum, count) sont des réductions reduceat
+sur la matrice entière, sans boucle par lieu ni dict par mesure.
+
+Périodes :
+    "3h", "6h"... : tranches de N heures (UTC)
+    "day"         : jour calendaire
+    "week"        : semaine ISO (lundi → dimanche, libellé 2025-W01)
+    "dekad"       : décade agronomique (1-10, 11-20, 21-fin du mois, libellé 2025-01-D1)
+    "month"       : mois calendaire
+
+Une période sans mesure valide vaut NaN (count = 0), y compris pour sum :
+absence de donnée n'est pas une valeur nulle. Les fenêtres glissantes
+(rolling) portent sur l'axe complet des périodes (complete=True), pour
+qu'une fenêtre de 7 jours couvre bien 7 jours.
+
+Usage:
+    python time_resample.py smap-sm_rootzone --freq day week dekad month
+    python time_resample.py modis-lst_day --freq dekad --codec MOD11A2 LST_Day_1km --rolling 3
+
+    from time_resample import resample
+    result = resample(cube.times, cube.values, "dekad", stats=("mean", "max"))
+    result["mean"], result.labels()
+"""
+
+import argparse
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from json_stream import write_json_stream
+
+SAMPLES_DIR = Path("raw-nasa-data/.cache/samples")
+OUTPUT_DIR = Path("public/data")
+PRECOMPRESS_MANIFEST = Path("raw-nasa-data/.cache/precompress.json")
+
+FREQUENCIES = ("day", "week", "dekad", "month")
+STATISTICS = ("mean", "min", "max", "sum", "count")
+
+HOURS_PATTERN = re.compile(r"^(\d+)h$")
+
+
+def _hours(freq):
+    """Nombre d'heures d'une fréquence infra-journalière ("3h" → 3), sinon None"""
+    match = HOURS_PATTERN.match(freq)
+    if not match:
+        return None
+    hours = int(match[1])
+    if hours <= 0 or 24 % hours:
+        raise ValueError(f"Fréquence {freq} : diviseur de 24 heures attendu")
+    return hours
+
+
+def period_ids(times, freq):
+    """Identifiant entier croissant de la période de chaque horodatage"""
+    times = np.asarray(times, dtype='datetime64[s]')
+    hours = _hours(freq)
+    if hours is not None:
+        return times.astype('datetime64[h]').astype(np.int64) // hours
+
+    days = times.astype('datetime64[D]')
+    if freq == "day":
+        return days.astype(np.int64)
+    if freq == "week":
+        # Le 1970-01-01 est un jeudi : +3 ramène les semaines au lundi
+        return (days.astype(np.int64) + 3) // 7
+    if freq == "dekad":
+        months = days.astype('datetime64[M]')
+        day_of_month = (days - months.astype('datetime64[D]')).astype(np.int64)
+        return months.astype(np.int64) * 3 + np.minimum(day_of_month // 10, 2)
+    if freq == "month":
+        return days.astype('datetime64[M]').astype(np.int64)
+
+    raise ValueError(f"Fréquence inconnue : {freq} ({', '.join(FREQUENCIES)} ou <N>h)")
+
+
+def period_starts(ids, freq):
+    """Début de chaque période (datetime64[s] en infra-journalier, datetime64[D] sinon)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    hours = _hours(freq)
+    if hours is not None:
+        return (ids * hours).astype('datetime64[h]').astype('datetime64[s]')
+
+    if freq == "day":
+        return ids.astype('datetime64[D]')
+    if freq == "week":
+        return (ids * 7 - 3).astype('datetime64[D]')
+    if freq == "dekad":
+        months = (ids // 3).astype('datetime64[M]').astype('datetime64[D]')
+        return months + (ids % 3) * 10
+    if freq == "month":
+        return ids.astype('datetime64[M]').astype('datetime64[D]')
+
+    raise ValueError(f"Fréquence inconnue : {freq}")
+
+
+def period_labels(ids, freq):
+    """Libellés lisibles : "2025-01-01T03", "2025-01-01", "2025-W01", "2025-01-D1", "2025-01" """
+    starts = period_starts(ids, freq)
+
+    if _hours(freq) is not None:
+        return np.datetime_as_string(starts, unit='h').tolist()
+    if freq == "day":
+        return np.datetime_as_string(starts, unit='D').tolist()
+    if freq == "month":
+        return np.datetime_as_string(starts, unit='M').tolist()
+    if freq == "dekad":
+        months = np.datetime_as_string(starts, unit='M')
+        return [f"{month}-D{dekad + 1}" for month, dekad in zip(months.tolist(), (np.asarray(ids) % 3).tolist())]
+
+    # Semaine ISO : année et numéro du jeudi de la semaine
+    thursdays = starts + 3
+    years = thursdays.astype('datetime64[Y]')
+    weeks = (thursdays - years.astype('datetime64[D]')).astype(np.int64) // 7 + 1
+    return [f"{year}-W{week:02d}" for year, week in zip(np.datetime_as_string(years).tolist(), weeks.tolist())]
+
+
+class Resampled:
+    """Statistiques par période : tableaux (périodes × lieux)"""
+
+    def __init__(self, freq, ids, stats, counts):
+        self.freq = freq
+        self.ids = ids
+        self.stats = stats
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, name):
+        return self.stats[name]
+
+    @property
+    def starts(self):
+        return period_starts(self.ids, self.freq)
+
+    def labels(self):
+        return period_labels(self.ids, self.freq)
+
+    def rolling(self, window, stat="mean", min_periods=1):
+        """Fenêtre glissante (en périodes, fenêtre terminée à chaque période) sur une statistique"""
+        if len(self.ids) and np.any(np.diff(self.ids) != 1):
+            raise ValueError("Fenêtre glissante sur un axe incomplet : resample(..., complete=True)")
+        if stat == "count":
+            # Nombre de mesures valides dans la fenêtre
+            return rolling(self.counts, window, "sum", min_periods=0)
+        if stat not in self.stats:
+            available = ", ".join(dict.fromkeys(list(self.stats) + ["count"]))
+            raise ValueError(f"Statistique non calculée : {stat} (disponibles : {available})")
+        return rolling(self.stats[stat], window, stat, min_periods)
+
+
+def resample(times, values, freq="day", stats=("mean",), decimals=None, complete=False):
+    """Agréger une matrice (temps × lieux) par période
+
+    times : horodatages (triés ou non) ; values : NaN = absent.
+    decimals arrondit chaque mesure (en float64) avant l'agrégation.
+    complete : toutes les périodes entre la première et la dernière, y
+    compris celles sans mesure (NaN, count = 0).
+    """
+    unknown = set(stats) - set(STATISTICS)
+    if unknown:
+        raise ValueError(f"Statistiques inconnues : {', '.join(sorted(unknown))}")
+
+    times = np.asarray(times, dtype='datetime64[s]')
+    values = np.asarray(values)
+
+    ids = period_ids(times, freq)
+    if len(times) == 0:
+        # Vecteur vide : un seul lieu, comme un vecteur non vide
+        locations = values.shape[1] if values.ndim == 2 else 1
+        empty = np.empty((0, locations))
+        return Resampled(freq, ids, {name: empty for name in stats}, np.zeros((0, locations), dtype=np.int32))
+
+    values = values.reshape(len(times), -1) if values.ndim != 2 else values
+    if np.any(ids[1:] < ids[:-1]):
+        order = np.argsort(ids, kind='stable')
+        ids, values = ids[order], values[order]
+
+    locations = values.shape[1]
+
+    # Limites des périodes (tranches contiguës de l'axe trié)
+    starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+    period = ids[starts]
+
+    values = values.astype(np.float64)
+    if decimals is not None:
+        values = np.round(values, decimals)
+
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int32), starts, axis=0)
+    empty = counts == 0
+
+    result = {}
+    if "mean" in stats or "sum" in stats:
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        if "mean" in stats:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result["mean"] = sums / counts
+        if "sum" in stats:
+            result["sum"] = np.where(empty, np.nan, sums)
+    if "min" in stats:
+        result["min"] = np.fmin.reduceat(values, starts, axis=0)
+    if "max" in stats:
+        result["max"] = np.fmax.reduceat(values, starts, axis=0)
+    if "count" in stats:
+        result["count"] = counts
+
+    if complete:
+        full = np.arange(period[0], period[-1] + 1)
+        rows = period - period[0]
+        for name, array in result.items():
+            filled = np.zeros((len(full), locations), dtype=array.dtype) if name == "count" \
+                else np.full((len(full), locations), np.nan)
+            filled[rows] = array
+            result[name] = filled
+        full_counts = np.zeros((len(full), locations), dtype=np.int32)
+        full_counts[rows] = counts
+        period, counts = full, full_counts
+
+    return Resampled(freq, period, {name: result[name] for name in stats}, counts)
+
+
+def rolling(values, window, stat="mean", min_periods=1):
+    """Fenêtre glissante de window lignes (terminée à chaque ligne), NaN ignorés
+
+    Sommes cumulées pour mean/sum/count, vue glissante pour min/max.
+    Une fenêtre avec moins de min_periods valeurs valides vaut NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1:
+        raise ValueError("Fenêtre d'au moins une période attendue")
+
+    valid = ~np.isnan(values)
+    padded_counts = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(valid, axis=0)])
+    counts = padded_counts[1:] - padded_counts[np.maximum(np.arange(1, len(values) + 1) - window, 0)]
+    enough = counts >= max(min_periods, 1)
+
+    if stat == "count":
+        return counts
+    if stat in ("mean", "sum"):
+        cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]),
+                                     np.cumsum(np.where(valid, values, 0.0), axis=0)])
+        sums = cumulative[1:] - cumulative[np.maximum(np.arange(1, len(values) + 1) - window, 0)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = sums / counts if stat == "mean" else sums
+        return np.where(enough, result, np.nan)
+    if stat in ("min", "max"):
+        padded = np.concatenate([np.full((window - 1,) + values.shape[1:], np.nan), values])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+        reduce = np.fmin if stat == "min" else np.fmax
+        return np.where(enough, reduce.reduce(windows, axis=-1), np.nan)
+
+    raise ValueError(f"Statistique glissante inconnue : {stat}")
+
+
+def compute_rollups(times, values, freqs=FREQUENCIES, stats=("mean", "min", "max", "count"),
+                    decimals=None, complete=True):
+    """Toutes les agrégations demandées d'une même matrice : {fréquence: Resampled}"""
+    return {freq: resample(times, values, freq, stats, decimals, complete) for freq in freqs}
+
+
+def rollup_entries(locations, rollups, windows=None, digits=4):
+    """Entrées JSON par lieu ; séries générées à la demande
+
+    windows : {fréquence: taille} ajoute "<stat>_rolling<taille>" pour chaque
+    statistique (hors count).
+    """
+    labels = {freq: result.labels() for freq, result in rollups.items()}
+    extras = {}
+    for freq, size in (windows or {}).items():
+        result = rollups[freq]
+        extras[freq] = {f"{name}_rolling{size}": result.rolling(size, name)
+                        for name in result.stats if name != "count"}
+
+    def series(freq, i):
+        result = rollups[freq]
+        arrays = {**result.stats, **extras.get(freq, {})}
+        for t, label in enumerate(labels[freq]):
+            entry = {"period": label}
+            for name, array in arrays.items():
+                value = array[t, i]
+                if name == "count":
+                    entry[name] = int(value)
+                else:
+                    entry[name] = None if np.isnan(value) else round(float(value), digits)
+            yield entry
+
+    for i, location in enumerate(locations):
+        yield {
+            "location": location,
+            "rollups": {freq: series(freq, i) for freq in rollups}
+        }
+
+
+def write_rollups(product, freqs, stats, directory=SAMPLES_DIR, output_file=None, windows=None,
+                  codec=None, pretty=False):
+    """Agréger un produit stocké (sample_store) et écrire un JSON
+
+    codec : LayerCodec (product_registry) pour décoder les valeurs brutes
+    (LST, NDVI) avant agrégation.
+    """
+    from sample_store import open_sample_store
+
+    cube, header = open_sample_store(directory, product)
+    values = codec.decode(cube.values) if codec is not None else cube.values
+
+    start = time.perf_counter()
+    rollups = compute_rollups(cube.times, values, freqs, stats)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {product} : {cube.values.shape[0]} dates × {cube.values.shape[1]} lieux → "
+          + ", ".join(f"{freq} {len(result)}" for freq, result in rollups.items())
+          + f" périodes en {elapsed:.3f}s")
+
+    output_file = Path(output_file or OUTPUT_DIR / f"nasa-{product}-rollups.json")
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        write_json_stream(f, {
+            "product": product,
+            "source": header.get("attrs", {}).get("source"),
+            "unit": codec.unit if codec is not None else header.get("attrs", {}).get("unit"),
+            "lastUpdate": datetime.now().strftime("%Y-%m-%d"),
+            "frequencies": list(freqs),
+            "statistics": list(stats),
+            "locations": rollup_entries(cube.locations, rollups, windows)
+        }, pretty=pretty, float_digits=4)
+
+    print(f"✅ Agrégations : {output_file}")
+    return output_file
+
+
+if __name__ == "__main__":
+    from precompress import precompress_outputs
+    from product_registry import get_codec
+
+    parser = argparse.ArgumentParser(description="Agrégations temporelles d'un produit échantillonné")
+    parser.add_argument("product", help="Produit du stockage d'échantillons (ex. smap-sm_rootzone)")
+    parser.add_argument("--dir", default=SAMPLES_DIR, help=f"Dossier des échantillons (défaut : {SAMPLES_DIR})")
+    parser.add_argument("--freq", nargs="+", default=list(FREQUENCIES),
+                        help="Périodes : day week dekad month ou <N>h (défaut : toutes)")
+    parser.add_argument("--stats", nargs="+", default=["mean", "min", "max", "count"],
+                        choices=STATISTICS, help="Statistiques par période")
+    parser.add_argument("--rolling", type=int, help="Fenêtre glissante (en périodes) ajoutée à chaque fréquence")
+    parser.add_argument("--codec", nargs=2, metavar=("PRODUIT", "COUCHE"),
+                        help="Décoder les valeurs brutes (ex. MOD11A2 LST_Day_1km)")
+    parser.add_argument("--output", help="Fichier JSON (défaut : public/data/nasa-<produit>-rollups.json)")
+    parser.add_argument("--pretty", action="store_true", help="JSON indenté (débogage)")
+    args = parser.parse_args()
+
+    codec = get_codec(*args.codec) if args.codec else None
+    if args.codec and codec is None:
+        parser.error(f"Couche inconnue du registre : {' '.join(args.codec)}")
+
+    windows = {freq: args.rolling for freq in args.freq} if args.rolling else None
+    json_file = write_rollups(args.product, args.freq, args.stats, args.dir, args.output,
+                              windows, codec, args.pretty)
+    precompress_outputs([json_file], PRECOMPRESS_MANIFEST)
@@ -0,0 +1,331 @@
+"""
+Statistiques zonales des GeoTIFF NASA sur des polygones (communes, départements)
+IleRise - NASA Space Apps Challenge 2025
+
+Au lieu d'un pixel par ville, chaque zone (polygone GeoJSON) reçoit par date
+la moyenne, la médiane, des percentiles et la fraction de pixels valides.
+
+Les polygones sont reprojetés et rastérisés une seule fois par grille en
+une image d'étiquettes (un entier par zone) : on en tire la liste des pixels
+de chaque zone, rangés zone après zone. Pour chaque fichier, seule la
+fenêtre englobant les zones est lue ; les fichiers sont empilés par lots
+(dates × pixels) et toutes les réductions sont vectorisées sur la pile
+(sommes par segment, tri par zone en deux passes). Ajouter des zones ne
+rajoute presque rien au coût par fichier.
+
+Une zone plus petite qu'un pixel (commune sur la grille SMAP à 9 km) reçoit
+les pixels qu'elle touche (all_touched) au lieu de rester vide.
+
+Usage:
+    from zonal_stats import ZoneMasks, load_zones, zonal_timeseries
+
+    masks = ZoneMasks(*load_zones("communes-benin.geojson"))
+    result = zonal_timeseries(masks, [("2025-01-01", tif_path)], decode)
+
+Requis:
+    pip install rasterio numpy
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from rasterio.features import rasterize
+from rasterio.warp import transform_geom
+from rasterio.windows import Window
+
+from json_stream import write_json_stream
+from quality_mask import open_group
+from raster_sampling import WGS84
+
+PERCENTILES = (10, 25, 50, 75, 90)
+BATCH_FILES = 16   # Fichiers empilés par réduction vectorisée
+
+# Propriétés GeoJSON essayées pour nommer une zone (communes, départements)
+NAME_PROPERTIES = ("name", "NAME", "shapeName", "NAME_2", "NAME_1", "commune", "departement")
+
+
+def load_zones(geojson_file, name_property=None):
+    """Noms et géométries (WGS84) des polygones d'un fichier GeoJSON"""
+    with open(geojson_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    features = data["features"] if data.get("type") == "FeatureCollection" else [data]
+
+    names = []
+    geometries = []
+    for i, feature in enumerate(features):
+        if not feature.get("geometry"):
+            continue
+
+        properties = feature.get("properties") or {}
+        keys = [name_property] if name_property else NAME_PROPERTIES
+        name = next((properties[key] for key in keys if properties.get(key)), None)
+
+        names.append(str(name) if name is not None else f"zone_{i + 1}")
+        geometries.append(feature["geometry"])
+
+    return names, geometries
+
+
+class ZoneLayout:
+    """Pixels des zones sur une grille, rangés zone après zone
+
+    window : fenêtre englobant toutes les zones (seule partie lue)
+    pixels : indices à plat dans la fenêtre, zone 0 puis zone 1...
+    starts, counts : début et nombre de pixels de chaque zone dans pixels
+    """
+
+    def __init__(self, window, pixels, counts):
+        self.window = window
+        self.pixels = pixels
+        self.counts = counts
+        self.starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        self.zone_ids = np.repeat(np.arange(len(counts)), counts)
+
+
+class ZoneMasks:
+    """Zones rastérisées, mises en cache par grille raster"""
+
+    def __init__(self, names, geometries):
+        self.names = list(names)
+        self.geometries = list(geometries)
+
+        self._projected = {}  # CRS (WKT) → géométries reprojetées
+        self._grids = {}      # (CRS, transform, shape) → ZoneLayout
+        self.rasterizations = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def grid_key(dataset):
+        """Clé identifiant la grille d'un dataset (CRS, transform, taille)"""
+        return (
+            dataset.crs.to_wkt(),
+            tuple(dataset.transform)[:6],
+            dataset.height,
+            dataset.width
+        )
+
+    def project(self, crs):
+        """Géométries reprojetées dans le CRS du raster (une fois par CRS)"""
+        crs_key = crs.to_wkt()
+
+        if crs_key not in self._projected:
+            self._projected[crs_key] = [transform_geom(WGS84, crs, geom) for geom in self.geometries]
+
+        return self._projected[crs_key]
+
+    def locate(self, dataset):
+        """Disposition des pixels de chaque zone sur la grille du dataset"""
+        key = self.grid_key(dataset)
+
+        if key not in self._grids:
+            self._grids[key] = self._rasterize(dataset)
+            self.rasterizations += 1
+
+        return self._grids[key]
+
+    def _rasterize(self, dataset):
+        shape = (dataset.height, dataset.width)
+        geometries = self.project(dataset.crs)
+
+        # Étiquettes 1..n (0 = hors zones) ; une seule passe pour toutes les zones
+        labels = rasterize(
+            [(geom, i + 1) for i, geom in enumerate(geometries)],
+            out_shape=shape, transform=dataset.transform, fill=0, dtype='int32'
+        ).ravel()
+
+        inside = np.flatnonzero(labels)
+        inside = inside[np.argsort(labels[inside], kind='stable')]
+        counts = np.bincount(labels[inside] - 1, minlength=len(self)).astype(np.int64)
+        segments = np.split(inside, np.cumsum(counts)[:-1])
+
+        # Zones sans centre de pixel : pixels touchés par le polygone
+        for i in np.flatnonzero(counts == 0):
+            touched = rasterize([(geometries[i], 1)], out_shape=shape,
+                                transform=dataset.transform, fill=0,
+                                dtype='uint8', all_touched=True)
+            segments[i] = np.flatnonzero(touched.ravel())
+            counts[i] = len(segments[i])
+
+        pixels = np.concatenate(segments) if len(self) else np.zeros(0, dtype=np.int64)
+        if not len(pixels):
+            return ZoneLayout(Window(0, 0, 0, 0), pixels, counts)
+
+        # Fenêtre englobante : indices ramenés à la fenêtre
+        rows, cols = np.divmod(pixels, dataset.width)
+        row_off, col_off = rows.min(), cols.min()
+        height, width = rows.max() - row_off + 1, cols.max() - col_off + 1
+        pixels = (rows - row_off) * width + (cols - col_off)
+
+        return ZoneLayout(Window(int(col_off), int(row_off), int(width), int(height)), pixels, counts)
+
+    def read(self, group, band=1):
+        """Valeurs brutes des pixels des zones (ordre de locate), masque QC et disposition
+
+        group : QualityGroup (bande et couches QC lues sur la même fenêtre).
+        """
+        layout = self.locate(group.dataset)
+        if not len(layout.pixels):
+            return np.zeros(0, dtype=group.dataset.dtypes[band - 1]), np.zeros(0, dtype=bool), layout
+
+        raw, good = group.read(layout.window, band, layout.pixels)
+        return raw, good, layout
+
+
+def sort_within_zones(values, zone_ids):
+    """Trier chaque ligne de values (dates × pixels) à l'intérieur de chaque zone
+
+    Les NaN se retrouvent en fin de zone. Deux tris pour toute la pile,
+    quel que soit le nombre de zones : rang global de chaque valeur, puis
+    tri de la clé (zone, rang).
+    """
+    dates, size = values.shape
+    order = np.argsort(values, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(size), values.shape), axis=1)
+
+    keys = zone_ids.astype(np.int64) * size + ranks
+    keys.sort(axis=1)
+    return np.take_along_axis(values, np.take_along_axis(order, keys % size, axis=1), axis=1)
+
+
+def zonal_reduce(values, layout, percentiles=PERCENTILES):
+    """Statistiques par zone d'une pile (dates × pixels) de valeurs décodées
+
+    values : float, NaN pour un pixel invalide, colonnes dans l'ordre de
+    layout.pixels. Retourne {statistique: tableau (dates × zones)} ;
+    NaN pour une zone sans pixel valide.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    dates = values.shape[0]
+    zones = len(layout.counts)
+
+    stats = {"valid_fraction": np.zeros((dates, zones))}
+    for name in ["mean"] + [f"p{q}" for q in percentiles]:
+        stats[name] = np.full((dates, zones), np.nan)
+
+    present = layout.counts > 0
+    if not present.any():
+        return stats
+
+    # reduceat : segments non vides uniquement (un segment vide renverrait une valeur)
+    starts = layout.starts[present]
+    valid = ~np.isnan(values)
+    valid_counts = np.add.reduceat(valid, starts, axis=1)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats["mean"][:, present] = sums / valid_counts
+    stats["valid_fraction"][:, present] = valid_counts / layout.counts[present]
+
+    # Percentiles (interpolation linéaire, comme np.nanpercentile) sur les valeurs triées
+    ordered = sort_within_zones(values, layout.zone_ids)
+    last = ordered.shape[1] - 1
+    rows = np.arange(dates)[:, None]
+    for q in percentiles:
+        position = starts + (valid_counts - 1) * (q / 100.0)
+        low = np.clip(np.floor(position).astype(np.int64), 0, last)
+        high = np.clip(np.minimum(low + 1, starts + valid_counts - 1), 0, last)
+        fraction = position - np.floor(position)
+        result = ordered[rows, low] + (ordered[rows, high] - ordered[rows, low]) * fraction
+        stats[f"p{q}"][:, present] = np.where(valid_counts > 0, result, np.nan)
+
+    return stats
+
+
+def zonal_timeseries(masks, files, decode, band=1, percentiles=PERCENTILES, batch=BATCH_FILES,
+                     quality=None):
+    """Statistiques zonales d'une série de fichiers d'une même grille
+
+    files : [(date, chemin)] ; decode(raw, dataset) → float (NaN si invalide).
+    quality : QualityMask, pixels rejetés par les couches QC mis à NaN.
+    Retourne {"dates", "zones", "pixels", "stats": {statistique: (dates × zones)}}.
+    """
+    dates = []
+    blocks = []
+    layout = None
+    pending = []
+
+    def flush():
+        if pending:
+            blocks.append(zonal_reduce(np.stack(pending), layout, percentiles))
+            pending.clear()
+
+    for date, path in files:
+        try:
+            with open_group(path, quality) as group:
+                raw, good, file_layout = masks.read(group, band)
+                values = np.where(good, decode(raw, group.dataset), np.nan)
+        except Exception as e:
+            print(f"   ❌ Erreur avec {Path(path).name}: {e}")
+            continue
+
+        # Changement de grille : réduire le lot en cours avec l'ancienne disposition
+        if file_layout is not layout:
+            flush()
+            layout = file_layout
+
+        dates.append(date)
+        pending.append(np.asarray(values, dtype=np.float64))
+        if len(pending) >= batch:
+            flush()
+
+    flush()
+
+    zones = len(masks)
+    names = ["valid_fraction", "mean"] + [f"p{q}" for q in percentiles]
+    stats = {
+        name: np.concatenate([block[name] for block in blocks]) if blocks else np.zeros((0, zones))
+        for name in names
+    }
+
+    return {
+        "dates": dates,
+        "zones": masks.names,
+        "pixels": layout.counts if layout is not None else np.zeros(zones, dtype=np.int64),
+        "stats": stats
+    }
+
+
+def _rounded(value, digits):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def zone_entries(result, digits=4):
+    """Entrées JSON par zone : nombre de pixels et série (générée à la demande)"""
+    stats = result["stats"]
+    names = [name for name in stats if name != "valid_fraction"]
+
+    def series(z):
+        for t, date in enumerate(result["dates"]):
+            entry = {"date": date}
+            for name in names:
+                key = "median" if name == "p50" else name
+                entry[key] = _rounded(stats[name][t, z], digits)
+            entry["valid_fraction"] = round(float(stats["valid_fraction"][t, z]), 4)
+            yield entry
+
+    for z, zone in enumerate(result["zones"]):
+        yield {
+            "zone": zone,
+            "pixels": int(result["pixels"][z]),
+            "timeseries": series(z)
+        }
+
+
+def write_zonal_json(json_file, result, meta=None, pretty=False, digits=4):
+    """Écrire les statistiques zonales en JSON (en flux)"""
+    json_file = Path(json_file)
+    json_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(json_file, 'w', encoding='utf-8') as f:
+        write_json_stream(f, {
+            **(meta or {}),
+            "zones": zone_entries(result, digits)
+        }, pretty=pretty, float_digits=digits)
+
+    print(f"🗺️  Statistiques zonales : {len(result['zones'])} zones × {len(result['dates'])} dates → {json_file}")
+    return json_file